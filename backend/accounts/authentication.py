@@ -0,0 +1,62 @@
+"""
+Authentication from role-carrying access tokens.
+
+RoleJWTAuthentication trusts the role in the token (see
+accounts.tokens) and returns a LazyUser that only queries the database when
+a view reads a field the token does not have. Revocation goes through the
+user's auth_version, which changes when the role changes or the account is
+deactivated: the current version is read from the cache, with a single-column
+query on a miss, and tokens carrying another version are rejected. Tokens
+without these claims are authenticated the usual way.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import LazyUser, User, auth_version_cache_key
+from .tokens import AUTH_VERSION_CLAIM, ROLE_CLAIM
+
+def get_auth_version(user_id):
+    """Return the user's current auth version, or 0 if the user cannot log in"""
+    key = auth_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = User.objects.filter(pk=user_id).values_list('auth_version', 'is_active').first()
+        version = row[0] if row is not None and row[1] else 0
+        cache.set(key, version, settings.AUTH_VERSION_CACHE_TIMEOUT)
+    return version
+
+class RoleJWTAuthentication(JWTAuthentication):
+    """JWT authentication that builds the user from the token's claims"""
+
+    def get_user(self, validated_token):
+        if AUTH_VERSION_CLAIM not in validated_token or ROLE_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = get_auth_version(user_id)
+        if not version:
+            raise AuthenticationFailed(_("User not found or inactive"), code="user_inactive")
+        if version != validated_token[AUTH_VERSION_CLAIM]:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        # Only fields the auth version covers come from the token; profile
+        # fields such as names can change at any time and are loaded on use
+        values = {
+            'id': user_id,
+            'role': validated_token[ROLE_CLAIM],
+            'auth_version': version,
+            'is_active': True,
+        }
+        # from_db() takes the values in the model's field order
+        field_names = [field.attname for field in LazyUser._meta.concrete_fields if field.attname in values]
+        return LazyUser.from_db(
+            router.db_for_read(LazyUser), field_names, [values[name] for name in field_names]
+        )
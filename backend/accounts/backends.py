@@ -1,5 +1,6 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from . import hashing
 
 User = get_user_model()
 
@@ -19,10 +20,11 @@ class EmailBackend(ModelBackend):
         except User.DoesNotExist:
             # Run the default password hasher once to reduce the timing
             # difference between an existing and a nonexistent user (#20760).
-            User().set_password(password)
+            hashing.make_password(password)
             return None
         
-        if user.check_password(password) and self.user_can_authenticate(user):
+        # Hashed in the hashing pool, which also upgrades outdated hashes
+        if hashing.check_password(user, password) and self.user_can_authenticate(user):
             return user
         
         return None
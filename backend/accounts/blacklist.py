@@ -0,0 +1,157 @@
+"""
+In-memory index of the refresh token blacklist.
+
+Every refresh and logout checks whether a token is blacklisted. Each process
+keeps a bloom filter of the ids (jti) of blacklisted, unexpired tokens: a
+token that is not in the filter is certainly not blacklisted and needs no
+query, and the rare hits are confirmed against the table.
+
+Processes keep their filters in sync through a generation counter in the
+cache: blacklisting a token bumps it once the blacklist row is committed, and
+a process that sees a new generation (or has not synced for
+TOKEN_BLACKLIST['SYNC_INTERVAL'] seconds) adds the rows blacklisted since its
+last sync, found by primary key. Rows can commit out of id order, so a sync
+reads every row above the highest id blacklisted more than
+TOKEN_BLACKLIST['COMMIT_MARGIN'] seconds ago, not just those above the
+highest id it has seen. The purge_expired_tokens command bumps an
+epoch instead, which makes every process rebuild its filter without the
+purged tokens.
+
+A process can only trust a miss when the counters live in a cache every
+process shares. With a per-process cache such as LocMemCache it never hears
+of tokens other processes blacklist, so every check falls back to the
+indexed lookup of the table.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from exammaster.caches import cache_is_shared
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+GENERATION_KEY = 'token_blacklist:generation'
+EPOCH_KEY = 'token_blacklist:epoch'
+LOAD_CHUNK_SIZE = 10000
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: position i is h1 + i * h2
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class BlacklistIndex:
+    """Bloom filter of blacklisted token ids, synced from the database"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        # Every row up to this id has been read; rows above it may still commit
+        self.floor_id = 0
+        self.generation = 0
+        self.epoch = 0
+        self.synced_at = 0
+
+    def rebuild(self, epoch):
+        blacklisted = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        capacity = max(settings.TOKEN_BLACKLIST['BLOOM_CAPACITY'], 2 * blacklisted.count())
+        self.bloom = BloomFilter(capacity, settings.TOKEN_BLACKLIST['BLOOM_ERROR_RATE'])
+        self.floor_id = 0
+        self.load(blacklisted)
+        self.epoch = epoch
+
+    def catch_up(self):
+        self.load(BlacklistedToken.objects.filter(id__gt=self.floor_id))
+
+    def load(self, blacklisted):
+        """Add blacklisted rows to the filter and advance the floor"""
+        # Rows inserted before the cutoff have committed, and so have all
+        # rows with lower ids, which were inserted even earlier
+        cutoff = timezone.now() - timedelta(seconds=settings.TOKEN_BLACKLIST['COMMIT_MARGIN'])
+        for blacklisted_id, jti, blacklisted_at in blacklisted.order_by('id').values_list(
+            'id', 'token__jti', 'blacklisted_at'
+        ).iterator(chunk_size=LOAD_CHUNK_SIZE):
+            # Rows above the floor are read again until they are old enough
+            if jti not in self.bloom:
+                self.bloom.add(jti)
+            if blacklisted_at < cutoff:
+                self.floor_id = blacklisted_id
+
+    def sync(self):
+        counters = cache.get_many([GENERATION_KEY, EPOCH_KEY])
+        generation, epoch = counters.get(GENERATION_KEY, 0), counters.get(EPOCH_KEY, 0)
+        stale = time.monotonic() - self.synced_at > settings.TOKEN_BLACKLIST['SYNC_INTERVAL']
+        if self.bloom is not None and generation == self.generation and epoch == self.epoch and not stale:
+            return
+
+        with self.lock:
+            if self.bloom is None or epoch != self.epoch or self.bloom.count > self.bloom.capacity:
+                self.rebuild(epoch)
+            self.catch_up()
+            self.generation = generation
+            self.synced_at = time.monotonic()
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self.bloom
+
+    def add(self, jti):
+        """Record a token this process just blacklisted"""
+        self.sync()
+        with self.lock:
+            self.bloom.add(jti)
+        # Other processes must find the row when they see the new generation
+        transaction.on_commit(self.announce)
+
+    def announce(self):
+        generation = bump(GENERATION_KEY)
+        with self.lock:
+            # Nobody else blacklisted anything since the last sync, no need to catch up
+            if generation == self.generation + 1:
+                self.generation = generation
+
+def bump(key):
+    """Increment a counter in the cache, creating it if needed"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+index = BlacklistIndex()
+
+def is_blacklisted(jti):
+    """Return whether the token with this jti is blacklisted"""
+    if cache_is_shared() and not index.might_contain(jti):
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+def remember(jti):
+    index.add(jti)
+
+def invalidate():
+    """Make every process rebuild its filter, e.g. after purging rows"""
+    bump(EPOCH_KEY)
@@ -0,0 +1,163 @@
+"""
+Password hashing off the request thread.
+
+Hashing a password with PBKDF2 takes a few hundred milliseconds of CPU, and a
+class signing in at once before an exam would otherwise starve every other
+request of the worker. Login, registration and the email backend hash and
+verify passwords in a small process pool instead, PASSWORD_HASHING['POOL_SIZE']
+processes per server process. At most that many hashes run at a time; others
+wait for a free process for up to QUEUE_TIMEOUT seconds, with at most
+MAX_QUEUE waiting, and fail with HashingUnavailable after that. Queue depth
+and latencies are kept in stats() for the hashing stats endpoint.
+
+Verifying a password whose hash was made with other hasher settings (another
+algorithm or fewer iterations) also returns a new hash, which callers save.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Latencies kept for the percentiles in stats()
+LATENCY_WINDOW = 1000
+
+class HashingUnavailable(Exception):
+    """Too many passwords are waiting to be hashed"""
+
+def _init_worker(settings_module):
+    # Spawned (not forked) workers start without Django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+def _make_password(password):
+    return hashers.make_password(password)
+
+def _check_password(password, encoded):
+    upgraded = []
+    correct = hashers.check_password(
+        password, encoded, setter=lambda raw: upgraded.append(hashers.make_password(raw))
+    )
+    return correct, upgraded[0] if upgraded else None
+
+class HashingPool:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.slots = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+        self.durations = deque(maxlen=LATENCY_WINDOW)
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                size = settings.PASSWORD_HASHING['POOL_SIZE']
+                # Forking a threaded server process can copy held locks and
+                # open database connections into the workers
+                self.executor = ProcessPoolExecutor(
+                    max_workers=size,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(settings.SETTINGS_MODULE,)
+                )
+                # Kept when a broken pool is replaced, hashes in flight release it
+                if self.slots is None:
+                    self.slots = threading.BoundedSemaphore(size)
+            return self.executor
+
+    def reset(self, executor):
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def run(self, func, *args):
+        if settings.PASSWORD_HASHING['POOL_SIZE'] <= 0:
+            return self.timed(func, *args)
+
+        executor = self.get_executor()
+        queued_at = time.monotonic()
+        with self.lock:
+            if self.waiting >= settings.PASSWORD_HASHING['MAX_QUEUE']:
+                self.rejected += 1
+                raise HashingUnavailable()
+            self.waiting += 1
+        acquired = self.slots.acquire(timeout=settings.PASSWORD_HASHING['QUEUE_TIMEOUT'])
+        with self.lock:
+            self.waiting -= 1
+            if not acquired:
+                self.rejected += 1
+                raise HashingUnavailable()
+            self.waits.append(time.monotonic() - queued_at)
+
+        try:
+            return self.timed(lambda: executor.submit(func, *args).result())
+        except BrokenProcessPool:
+            # A worker died; start a new pool next time and hash here meanwhile
+            self.reset(executor)
+            return func(*args)
+        finally:
+            self.slots.release()
+
+    def timed(self, func, *args):
+        started = time.monotonic()
+        with self.lock:
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+                self.durations.append(time.monotonic() - started)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'pool_size': settings.PASSWORD_HASHING['POOL_SIZE'],
+                'queue_depth': self.waiting,
+                'running': self.running,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'queue_wait_ms': percentiles(self.waits),
+                'hash_ms': percentiles(self.durations),
+            }
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return None
+    pick = lambda fraction: round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 1)
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'max': pick(1)}
+
+pool = HashingPool()
+
+def make_password(password):
+    """Hash a password in the pool"""
+    return pool.run(_make_password, password)
+
+def check_password(user, password):
+    """
+    Return whether password is the user's password. A correct password
+    hashed with outdated settings is hashed again and saved.
+    """
+    if password is None or not hashers.is_password_usable(user.password):
+        return False
+    correct, upgraded = pool.run(_check_password, password, user.password)
+    if upgraded:
+        user.password = upgraded
+        user.save(update_fields=['password'])
+    return correct
+
+def stats():
+    return pool.stats()
@@ -0,0 +1,245 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from questions import search
+from questions.models import Subject, Question, QuestionOption
+from exams.models import Exam, ExamQuestion
+from submissions.models import ExamSubmission, StudentAnswer, ExamStatistics
+from submissions.statistics import apply_submission
+
+User = get_user_model()
+
+SUBJECTS = (
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'History', 'Geography',
+    'Literature', 'Computer Science', 'Economics', 'Philosophy', 'Art', 'Music',
+)
+FIRST_NAMES = (
+    'Alex', 'Sam', 'Maria', 'Chen', 'Fatima', 'Lucas', 'Aisha', 'Noah', 'Yuki', 'Elena',
+    'Omar', 'Priya', 'Jonas', 'Sofia', 'Mateo', 'Amara', 'Leon', 'Mia', 'Ravi', 'Zoe',
+)
+LAST_NAMES = (
+    'Smith', 'Garcia', 'Wang', 'Khan', 'Muller', 'Silva', 'Okafor', 'Kim', 'Rossi', 'Novak',
+    'Patel', 'Cohen', 'Tanaka', 'Dubois', 'Jensen', 'Lopez', 'Ivanov', 'Mensah', 'Ali', 'Brown',
+)
+QUESTION_TEMPLATES = (
+    'Which of the following best describes {topic} in {subject}?',
+    'What is the main consequence of {topic}?',
+    'Which statements about {topic} are true?',
+    'How is {topic} usually measured in {subject}?',
+    'Which example illustrates {topic}?',
+)
+TOPICS = (
+    'equilibrium', 'growth', 'structure', 'change over time', 'classification', 'energy',
+    'interaction', 'scale', 'cause and effect', 'patterns', 'systems', 'models',
+)
+
+class Command(BaseCommand):
+    help = 'Generate a large, seeded dataset of users, questions, exams and graded submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--teachers', type=int, default=20)
+        parser.add_argument('--subjects', type=int, default=len(SUBJECTS))
+        parser.add_argument('--questions', type=int, default=2000, help='Questions in the bank')
+        parser.add_argument('--exams', type=int, default=20)
+        parser.add_argument('--questions-per-exam', type=int, default=25)
+        parser.add_argument('--takers', type=int, default=200, help='Graded submissions per exam')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed; datasets with different seeds can coexist')
+        parser.add_argument('--password', default='password123', help='Password of every generated user')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        if options['takers'] > options['students']:
+            raise CommandError('--takers cannot exceed --students')
+        if options['questions'] < options['questions_per_exam']:
+            raise CommandError('--questions-per-exam cannot exceed --questions')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.domain = f"dataset{options['seed']}.test"
+        if User.objects.filter(email__endswith=f'@{self.domain}').exists():
+            raise CommandError(f'A dataset with seed {options["seed"]} already exists, use another --seed')
+
+        started = time.monotonic()
+        # One full-cost hash shared by every user instead of one per user
+        password = make_password(options['password'])
+        teachers = self.create_users('teacher', options['teachers'], password)
+        students = self.create_users('student', options['students'], password)
+        self.log(started, f'{len(teachers)} teachers and {len(students)} students')
+
+        subjects = self.create_subjects(options['subjects'])
+        bank = self.create_questions(subjects, teachers, options['questions'])
+        self.log(started, f'{len(bank)} questions')
+
+        answers = 0
+        for number in range(1, options['exams'] + 1):
+            exam, questions = self.create_exam(number, subjects, teachers, bank, options['questions_per_exam'])
+            answers += self.create_submissions(exam, questions, bank, students, options['takers'])
+        self.log(started, f"{options['exams']} exams, {options['exams'] * options['takers']} submissions, {answers} answers")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Dataset generated in {time.monotonic() - started:.0f}s. '
+            f"Users are <role><n>@{self.domain}, password {options['password']}"
+        ))
+
+    def log(self, started, message):
+        self.stdout.write(f'[{time.monotonic() - started:6.1f}s] {message}')
+
+    def create_users(self, role, count, password):
+        """Create users and return their ids"""
+        ids = []
+        for start in range(0, count, self.batch_size):
+            users = [
+                User(
+                    username=f'{role}{number}.{self.domain}',
+                    email=f'{role}{number}@{self.domain}',
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    role=role,
+                    password=password,
+                )
+                for number in range(start + 1, min(start + self.batch_size, count) + 1)
+            ]
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+            ids.extend(user.pk for user in users)
+        return ids
+
+    def create_subjects(self, count):
+        names = [
+            SUBJECTS[index % len(SUBJECTS)] + (f' {index // len(SUBJECTS) + 1}' if index >= len(SUBJECTS) else '')
+            for index in range(count)
+        ]
+        # Subjects are shared with other datasets and existing data
+        Subject.objects.bulk_create([Subject(name=name) for name in names], ignore_conflicts=True)
+        return dict(Subject.objects.filter(name__in=names).values_list('id', 'name'))
+
+    def create_questions(self, subjects, teachers, count):
+        """
+        Create the question bank and return {question id: (subject id, points,
+        correct option ids, wrong option ids)} for grading generated answers.
+        """
+        bank = {}
+        subject_ids = list(subjects)
+        for start in range(0, count, self.batch_size):
+            questions = []
+            for _ in range(start, min(start + self.batch_size, count)):
+                subject_id = self.rng.choice(subject_ids)
+                question_type = 'multiple-choice' if self.rng.random() < 0.3 else 'single-choice'
+                questions.append(Question(
+                    text=self.rng.choice(QUESTION_TEMPLATES).format(
+                        topic=self.rng.choice(TOPICS), subject=subjects[subject_id]
+                    ),
+                    subject_id=subject_id,
+                    type=question_type,
+                    points=self.rng.choice((1, 1, 1, 2, 2, 3, 5)),
+                    author_id=self.rng.choice(teachers),
+                ))
+            with transaction.atomic():
+                Question.objects.bulk_create(questions, batch_size=self.batch_size)
+                options = []
+                for question in questions:
+                    option_count = self.rng.randint(3, 5)
+                    correct_count = self.rng.randint(2, option_count - 1) if question.type == 'multiple-choice' else 1
+                    correct = set(self.rng.sample(range(option_count), correct_count))
+                    options.extend(
+                        QuestionOption(
+                            question=question,
+                            text=f'Answer {"ABCDE"[order]} about {self.rng.choice(TOPICS)}',
+                            is_correct=order in correct,
+                            order=order + 1,
+                        )
+                        for order in range(option_count)
+                    )
+                QuestionOption.objects.bulk_create(options, batch_size=self.batch_size)
+                # bulk_create skips the signals that maintain the search index
+                search.index_questions([question.pk for question in questions])
+            for question in questions:
+                bank[question.pk] = (question.subject_id, question.points, [], [])
+            for option in options:
+                bank[option.question_id][2 if option.is_correct else 3].append(option.pk)
+        return bank
+
+    def create_exam(self, number, subjects, teachers, bank, question_count):
+        # Exams draw from one subject when it has enough questions
+        subject_id = self.rng.choice(list(subjects))
+        pool = [question_id for question_id, entry in bank.items() if entry[0] == subject_id]
+        if len(pool) < question_count:
+            pool = list(bank)
+        question_ids = self.rng.sample(pool, question_count)
+        end_time = timezone.now() - timedelta(days=self.rng.randint(0, 365))
+        exam = Exam(
+            title=f'{subjects[subject_id]} Exam {number}',
+            description=f'Generated exam {number}',
+            duration=self.rng.choice((30, 45, 60, 90)),
+            total_marks=sum(bank[question_id][1] for question_id in question_ids),
+            pass_percentage=self.rng.choice((40, 50, 60)),
+            start_time=end_time - timedelta(days=7),
+            end_time=end_time,
+            is_published=True,
+            created_by_id=self.rng.choice(teachers),
+        )
+        exam.save()
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(exam=exam, question_id=question_id, order=order)
+            for order, question_id in enumerate(question_ids, start=1)
+        ])
+        return exam, question_ids
+
+    def create_submissions(self, exam, question_ids, bank, students, takers):
+        """Create graded submissions with answers and the exam's statistics, and return the answer count"""
+        statistics = ExamStatistics(exam=exam, percentage_counts=[], duration_counts=[], revision=1)
+        answer_count = 0
+        takers = self.rng.sample(students, takers)
+        with transaction.atomic():
+            for start in range(0, len(takers), self.batch_size):
+                submissions = []
+                answers = []
+                for student_id in takers[start:start + self.batch_size]:
+                    # Each student answers correctly with their own probability
+                    ability = self.rng.betavariate(5, 3)
+                    started_at = exam.start_time + timedelta(minutes=self.rng.randint(0, 7 * 24 * 60 - exam.duration))
+                    submission = ExamSubmission(
+                        exam=exam,
+                        student_id=student_id,
+                        start_time=started_at,
+                        submit_time=started_at + timedelta(seconds=self.rng.randint(60, exam.duration * 60)),
+                        status=ExamSubmission.GRADED,
+                        total_marks=exam.total_marks,
+                        tab_switches=self.rng.choice((0, 0, 0, 0, 1, 2)),
+                    )
+                    for question_id in question_ids:
+                        _, points, correct, wrong = bank[question_id]
+                        is_correct = self.rng.random() < ability
+                        if is_correct:
+                            selected = list(correct)
+                        elif len(correct) > 1 and self.rng.random() < 0.5:
+                            selected = correct[:-1]
+                        else:
+                            selected = [self.rng.choice(wrong)]
+                        answers.append((submission, question_id, selected, is_correct, points if is_correct else 0))
+                        submission.score += points if is_correct else 0
+                    submission.percentage = submission.score / exam.total_marks * 100 if exam.total_marks else 0
+                    submission.is_passed = submission.percentage >= exam.pass_percentage
+                    apply_submission(statistics, submission)
+                    submissions.append(submission)
+                ExamSubmission.objects.bulk_create(submissions, batch_size=self.batch_size)
+                # Answers are built once their submissions have ids, which is
+                # cheaper than assigning the submission objects
+                StudentAnswer.objects.bulk_create([
+                    StudentAnswer(
+                        submission_id=submission.pk,
+                        question_id=question_id,
+                        selected_option_ids=selected,
+                        is_correct=is_correct,
+                        points_earned=points_earned,
+                    )
+                    for submission, question_id, selected, is_correct, points_earned in answers
+                ], batch_size=self.batch_size)
+                answer_count += len(answers)
+            statistics.save()
+        return answer_count
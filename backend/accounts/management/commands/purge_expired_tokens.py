@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from accounts import blacklist
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens (run it daily, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=settings.TOKEN_BLACKLIST['PURGE_CHUNK_SIZE'],
+                            help='Tokens deleted per query')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        chunk_size = options['chunk_size']
+        last_id = 0
+        outstanding_count = blacklisted_count = 0
+        while True:
+            # Walk the primary key so each chunk is found without scanning from the start again
+            ids = list(OutstandingToken.objects.filter(
+                id__gt=last_id, expires_at__lt=now
+            ).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            # Blacklist rows go with their tokens, in one DELETE per chunk
+            _, deleted = OutstandingToken.objects.filter(id__in=ids).delete()
+            outstanding_count += deleted.get(OutstandingToken._meta.label, 0)
+            blacklisted_count += deleted.get(BlacklistedToken._meta.label, 0)
+            self.stdout.write(f'Deleted {outstanding_count} tokens...')
+
+        if outstanding_count:
+            blacklist.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {outstanding_count} expired tokens, {blacklisted_count} of them blacklisted'
+        ))
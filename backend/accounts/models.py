@@ -1,6 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
+from django.core.cache import cache
+
+def auth_version_cache_key(user_id):
+    return f'auth_version:{user_id}'
 
 class User(AbstractUser):
     """
@@ -10,6 +14,8 @@ class User(AbstractUser):
     
     email = models.EmailField(unique=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='student')
+    # Bumped on role changes and deactivation, which revokes issued access tokens
+    auth_version = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -23,6 +29,33 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.get_full_name()} ({self.role})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._loaded_auth_state = (user.__dict__.get('role'), user.__dict__.get('is_active'))
+        return user
+    
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_auth_state', None)
+        if loaded is not None and loaded != (self.role, self.is_active):
+            self.auth_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'auth_version'}
+        super().save(*args, **kwargs)
+        self._loaded_auth_state = (self.role, self.is_active)
+        cache.set(
+            auth_version_cache_key(self.pk),
+            self.auth_version if self.is_active else 0,
+            settings.AUTH_VERSION_CACHE_TIMEOUT
+        )
+    
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        cache.delete(auth_version_cache_key(user_id))
+        return result
+    
     @property
     def is_admin(self):
         return self.role == 'admin'
@@ -38,4 +71,24 @@ class User(AbstractUser):
     class Meta:
         db_table = 'users'
         verbose_name = 'User'
-        verbose_name_plural = 'Users' 
\ No newline at end of file
+        verbose_name_plural = 'Users'
+        indexes = [
+            # Keyset pagination of the user management list
+            models.Index(fields=['-created_at', '-id'], name='user_created_at_idx'),
+        ]
+
+class LazyUser(User):
+    """
+    User built from the claims of an access token. Fields that are not in the
+    token are deferred, and the first access to any of them loads them all
+    with a single query.
+    """
+    
+    class Meta:
+        proxy = True
+    
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.issuperset(fields):
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields)
@@ -2,7 +2,10 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from . import hashing
 from .models import User
+from .tokens import RoleRefreshToken
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model"""
@@ -28,10 +31,16 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password_confirm')
+        password = validated_data.pop('password')
         # Generate username from email if not provided
         if 'username' not in validated_data:
             validated_data['username'] = validated_data['email'].split('@')[0]
-        user = User.objects.create_user(**validated_data)
+        # What create_user() does, with the password hashed in the hashing pool
+        user = User(**validated_data)
+        user.email = User.objects.normalize_email(user.email)
+        user.username = User.normalize_username(user.username)
+        user.password = hashing.make_password(password)
+        user.save()
         return user
 
 class UserLoginSerializer(serializers.Serializer):
@@ -92,5 +101,8 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
     def validate(self, attrs):
         if attrs['new_password'] != attrs['confirm_password']:
             raise serializers.ValidationError("Passwords don't match")
-        return attrs 
- 
\ No newline at end of file
+        return attrs
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer that checks the blacklist through its in-memory index"""
+    token_class = RoleRefreshToken
@@ -0,0 +1,104 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from . import blacklist
+from .models import User
+
+class RoleTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='student', email='student@example.com', password='pw12345!x',
+            first_name='Old', last_name='Name', role='student'
+        )
+
+    def login(self):
+        response = APIClient().post(
+            '/api/auth/login/', {'email': 'student@example.com', 'password': 'pw12345!x'}, format='json'
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.json()['access'])
+        return client
+
+    def test_profile_changes_show_with_existing_tokens(self):
+        client = self.login()
+        response = client.patch('/api/auth/profile/update/', {'first_name': 'New'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get('/api/auth/profile/').json()['first_name'], 'New')
+
+    def test_role_change_revokes_tokens(self):
+        client = self.login()
+        self.user.role = 'teacher'
+        self.user.save()
+        self.assertEqual(client.get('/api/auth/profile/').status_code, 401)
+
+class BlacklistTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='student', email='student@example.com', password='pw12345!x', role='student'
+        )
+        self.refresh = APIClient().post(
+            '/api/auth/login/', {'email': 'student@example.com', 'password': 'pw12345!x'}, format='json'
+        ).json()['refresh']
+
+    def test_tokens_blacklisted_by_other_processes_are_rejected(self):
+        # Load this process's filter, then blacklist as another process would
+        blacklist.is_blacklisted('unknown')
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(user=self.user))
+
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_purge_deletes_expired_tokens_and_their_blacklist_rows(self):
+        token = OutstandingToken.objects.get(user=self.user)
+        BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.filter(pk=token.pk).update(expires_at=timezone.now() - timedelta(days=1))
+
+        output = StringIO()
+        call_command('purge_expired_tokens', stdout=output)
+        self.assertIn('Deleted 1 expired tokens, 1 of them blacklisted', output.getvalue())
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'exammaster-test-cache'),
+}})
+class SharedBlacklistIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='student', email='student@example.com', password='pw', role='student'
+        )
+        index = blacklist.BlacklistIndex()
+        patcher = mock.patch.object(blacklist, 'index', index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def outstanding(self, jti):
+        return OutstandingToken.objects.create(
+            user=self.user, jti=jti, token=jti, expires_at=timezone.now() + timedelta(days=1)
+        )
+
+    def test_hits_are_confirmed_and_misses_skip_the_table(self):
+        BlacklistedToken.objects.create(token=self.outstanding('revoked'))
+        self.assertTrue(blacklist.is_blacklisted('revoked'))
+        with self.assertNumQueries(0):
+            self.assertFalse(blacklist.is_blacklisted('valid'))
+
+    def test_rows_committed_out_of_id_order_are_found(self):
+        late = self.outstanding('late')
+        BlacklistedToken.objects.create(id=10, token=self.outstanding('early'))
+        self.assertFalse(blacklist.is_blacklisted('late'))
+
+        # Another process commits a row with a lower id after this one synced
+        BlacklistedToken.objects.create(id=5, token=late)
+        blacklist.bump(blacklist.GENERATION_KEY)
+        self.assertTrue(blacklist.is_blacklisted('late'))
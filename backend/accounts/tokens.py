@@ -0,0 +1,36 @@
+"""
+JWTs that carry what permission checks need.
+
+Refresh tokens issued by for_user() carry the user's role and auth
+version, and simplejwt copies those claims into every access token made from
+them. RoleJWTAuthentication builds request.user from these claims instead of
+loading the user row (see accounts.authentication). Blacklist checks go
+through the in-memory index of accounts.blacklist.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from . import blacklist as blacklist_index
+
+ROLE_CLAIM = 'role'
+AUTH_VERSION_CLAIM = 'auth_version'
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token whose access tokens identify the user's role"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ROLE_CLAIM] = user.role
+        token[AUTH_VERSION_CLAIM] = user.auth_version
+        return token
+
+    def check_blacklist(self):
+        if blacklist_index.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_index.remember(self.payload[api_settings.JTI_CLAIM])
+        return result
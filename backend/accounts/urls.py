@@ -11,6 +11,7 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('users/', views.UserManagementView.as_view(), name='user_management'),
     path('users/<int:pk>/', views.UserDetailView.as_view(), name='user_detail'),
+    path('hashing/stats/', views.hashing_stats, name='hashing_stats'),
     path('password-reset/request/', views.request_password_reset, name='request_password_reset'),
     path('password-reset/confirm/', views.confirm_password_reset, name='confirm_password_reset'),
 ] 
\ No newline at end of file
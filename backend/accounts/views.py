@@ -3,7 +3,6 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model, authenticate
 from django.utils import timezone
 from django.core.mail import send_mail
@@ -21,19 +20,33 @@ from .serializers import (
     PasswordResetConfirmSerializer
 )
 from .permissions import IsAdminUser
+from .tokens import RoleRefreshToken
+from . import hashing
+from exammaster.pagination import OptInCursorPagination
 import random
 import string
 
 User = get_user_model()
 
+def hashing_unavailable():
+    """Response for requests that waited too long to hash a password"""
+    return Response(
+        {'error': 'Too many sign-ins at the moment, please try again shortly'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(int(settings.PASSWORD_HASHING['QUEUE_TIMEOUT']))}
+    )
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
     """User registration endpoint"""
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        try:
+            user = serializer.save()
+        except hashing.HashingUnavailable:
+            return hashing_unavailable()
+        refresh = RoleRefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
@@ -57,7 +70,7 @@ def login(request):
         logger.info(f"User {user.email} authenticated successfully")
         
         try:
-            refresh = RefreshToken.for_user(user)
+            refresh = RoleRefreshToken.for_user(user)
             logger.info("Refresh token generated successfully")
             
             response_data = {
@@ -76,6 +89,9 @@ def login(request):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
             
+    except hashing.HashingUnavailable:
+        logger.warning("Login rejected, the password hashing queue is full")
+        return hashing_unavailable()
     except Exception as e:
         logger.error(f"Unexpected error in login view: {str(e)}", exc_info=True)
         return Response(
@@ -89,7 +105,7 @@ def logout(request):
     """User logout endpoint"""
     try:
         refresh_token = request.data["refresh"]
-        token = RefreshToken(refresh_token)
+        token = RoleRefreshToken(refresh_token)
         token.blacklist()
         return Response({'message': 'Successfully logged out'}, status=status.HTTP_200_OK)
     except Exception as e:
@@ -117,13 +133,15 @@ class UserManagementView(generics.ListCreateAPIView):
     queryset = User.objects.all()
     serializer_class = AdminUserManagementSerializer
     permission_classes = [IsAdminUser]
+    ordering = ['-created_at', '-id']
+    pagination_class = OptInCursorPagination
     
     def get_queryset(self):
         queryset = User.objects.all()
         role = self.request.query_params.get('role', None)
         if role:
             queryset = queryset.filter(role=role)
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Admin view for managing individual users"""
@@ -131,6 +149,12 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AdminUserManagementSerializer
     permission_classes = [IsAdminUser]
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def hashing_stats(request):
+    """Password hashing queue depth and latencies of this server process"""
+    return Response(hashing.stats())
+
 def generate_reset_code():
     """Generate a 6-digit reset code"""
     return ''.join(random.choices(string.digits, k=6))
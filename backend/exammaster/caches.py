@@ -0,0 +1,18 @@
+"""
+Helpers for code whose correctness depends on the configured cache backend.
+
+Some features keep state in the cache that every server process must see,
+such as buffered autosaves or the blacklist generation counter. Those only
+work, or only skip the database, when the default cache is shared.
+"""
+from django.conf import settings
+
+# Caches that every server process has its own copy of
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+def cache_is_shared(alias='default'):
+    """Return whether every server process sees the same cache"""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_CACHES
@@ -0,0 +1,155 @@
+"""
+Opt-in keyset pagination for large list endpoints.
+
+Page number pagination stays the default. Clients that pass
+``?pagination=cursor`` (and every ``next``/``previous`` link they follow,
+which carries a ``cursor`` parameter) get keyset pagination instead: the
+cursor holds the ordering values of the last row seen, pages are fetched with
+a ``WHERE`` on those values rather than an ``OFFSET``, and no ``COUNT(*)`` is
+run, so deep pages cost the same as the first one. The primary key is always
+part of the ordering, which keeps rows with equal timestamps in a total order.
+
+Results ordered by search relevance have no column a cursor could hold, so
+cursor pagination of ranked search results is rejected; clients pass an
+explicit ``ordering`` or use page numbers.
+"""
+import datetime
+import json
+from functools import reduce
+from operator import attrgetter
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+
+# Ordering annotation of full-text search results (see questions.search)
+RANK_FIELD = 'search_rank'
+
+def _reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+def _encode_value(value):
+    # Keep full precision, JSON encoders round datetimes to milliseconds
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+class OptInCursorPagination(CursorPagination):
+    """Keyset pagination when asked for, page number pagination otherwise"""
+    mode_query_param = 'pagination'
+    fallback_class = PageNumberPagination
+    ordering = ('-created_at', '-id')
+
+    def use_cursor(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            self.fallback = self.fallback_class()
+            page = self.fallback.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.fallback.display_page_controls
+            return page
+
+        self.fallback = None
+        if RANK_FIELD in queryset.query.order_by:
+            raise ValidationError({self.mode_query_param: [
+                'Search results are ordered by relevance, which cursor pagination cannot keep. '
+                'Pass an ordering or use page numbers.'
+            ]})
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after_position(ordering, position))
+
+        # Fetch one extra row to find out whether there is a following page
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+
+        self.has_next = position is not None if reverse else has_following
+        self.has_previous = has_following if reverse else position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.fallback is not None:
+            return self.fallback.to_html()
+        return super().to_html()
+
+    def after_position(self, ordering, position):
+        """Filter for the rows that follow a position in the given ordering"""
+        conditions = []
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            preceding = {other.lstrip('-'): value for other, value in zip(ordering[:i], position)}
+            conditions.append(Q(**preceding, **{name + lookup: position[i]}))
+        return reduce(lambda a, b: a | b, conditions)
+
+    def get_position(self, instance):
+        return [
+            _encode_value(attrgetter(field.lstrip('-').replace('__', '.'))(instance))
+            for field in self.ordering
+        ]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        # An empty reversed page means nothing precedes the cursor, so the
+        # next page starts from the beginning
+        position = self.get_position(self.page[-1]) if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        position = self.get_position(self.page[0]) if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def encode_cursor(self, cursor):
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position, separators=(',', ':')))
+        return super().encode_cursor(cursor)
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+
+        # Break ties on the primary key so that the order is total
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
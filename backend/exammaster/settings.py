@@ -75,6 +75,19 @@ DATABASES = {
     }
 }
 
+# Cache
+# Defaults to a per-process cache; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. Redis or Memcached) so that all workers see the same entries.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='exammaster'),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -108,12 +121,93 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Compiled exam answer keys are keyed by content version, so they only expire
+# to free memory, never to pick up edits
+ANSWER_KEY_CACHE_TIMEOUT = config('ANSWER_KEY_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# Same for the pre-rendered payload served to students taking an exam
+EXAM_PAYLOAD_CACHE_TIMEOUT = config('EXAM_PAYLOAD_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# Submission grading
+# 'sync' grades inside the submit request; 'async' stores the answers and
+# returns 202, leaving grading to the run_grading_workers command
+SUBMISSION_GRADING_MODE = config('SUBMISSION_GRADING_MODE', default='sync')
+
+GRADING_QUEUE = {
+    'WORKERS': config('GRADING_WORKERS', default=2, cast=int),
+    'BATCH_SIZE': config('GRADING_BATCH_SIZE', default=50, cast=int),
+    'POLL_INTERVAL': config('GRADING_POLL_INTERVAL', default=1.0, cast=float),
+    'CLAIM_TIMEOUT': config('GRADING_CLAIM_TIMEOUT', default=300, cast=int),  # seconds
+}
+
+# Bulk regrading of stored answers (regrade command and API)
+REGRADE = {
+    'CHUNK_SIZE': config('REGRADE_CHUNK_SIZE', default=5000, cast=int),
+    'WORKERS': config('REGRADE_WORKERS', default=1, cast=int),
+}
+
+# Autosave of exams in progress: answers are saved as they arrive, or, with a
+# FLUSH_INTERVAL, buffered in the cache and written at most once per
+# FLUSH_INTERVAL seconds. Buffering needs a cache shared by all server
+# processes (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache)
+# and `manage.py flush_autosaves` running, which writes the buffers of students
+# who stopped answering. BUFFER_TIMEOUT only expires abandoned buffers
+AUTOSAVE = {
+    'FLUSH_INTERVAL': config('AUTOSAVE_FLUSH_INTERVAL', default=0, cast=int),
+    'BUFFER_TIMEOUT': config('AUTOSAVE_BUFFER_TIMEOUT', default=60 * 60 * 6, cast=int),
+}
+
+# Admission control for /api/exams/take/<pk>/ and /api/exams/available/.
+# RATE and QUEUE_SIZE are defaults that exams can override individually.
+# Requests over RATE get a 429 at once; the first QUEUE_SIZE of them each
+# second are told to retry in a later refill, the rest after between
+# RETRY_AFTER and twice that many seconds
+EXAM_ADMISSION = {
+    'ENABLED': config('EXAM_ADMISSION_ENABLED', default=True, cast=bool),
+    'RATE': config('EXAM_ADMISSION_RATE', default=100, cast=int),
+    'QUEUE_SIZE': config('EXAM_ADMISSION_QUEUE_SIZE', default=500, cast=int),
+    'RETRY_AFTER': config('EXAM_ADMISSION_RETRY_AFTER', default=5, cast=int),
+}
+
+# Access tokens carry the user's role and auth version, so API requests can
+# skip loading the user. Auth versions are cached for AUTH_VERSION_CACHE_TIMEOUT
+# seconds: with a per-process cache, revocations reach other workers within
+# that time
+JWT_ROLE_AUTHENTICATION = config('JWT_ROLE_AUTHENTICATION', default=True, cast=bool)
+AUTH_VERSION_CACHE_TIMEOUT = config('AUTH_VERSION_CACHE_TIMEOUT', default=60, cast=int)
+
+# Each process keeps a bloom filter of blacklisted refresh tokens, so refreshes
+# of tokens that are not blacklisted skip the blacklist table when CACHE_BACKEND
+# is shared by all processes (with a per-process cache every refresh queries
+# it). Filters catch up with other processes within SYNC_INTERVAL seconds,
+# re-reading rows blacklisted in the last COMMIT_MARGIN seconds (longer than
+# any transaction) since they can commit out of id order;
+# purge_expired_tokens deletes expired rows PURGE_CHUNK_SIZE at a time
+TOKEN_BLACKLIST = {
+    'BLOOM_CAPACITY': config('TOKEN_BLACKLIST_BLOOM_CAPACITY', default=1000000, cast=int),
+    'BLOOM_ERROR_RATE': config('TOKEN_BLACKLIST_BLOOM_ERROR_RATE', default=0.001, cast=float),
+    'SYNC_INTERVAL': config('TOKEN_BLACKLIST_SYNC_INTERVAL', default=5, cast=int),
+    'COMMIT_MARGIN': config('TOKEN_BLACKLIST_COMMIT_MARGIN', default=60, cast=int),
+    'PURGE_CHUNK_SIZE': config('TOKEN_BLACKLIST_PURGE_CHUNK_SIZE', default=5000, cast=int),
+}
+
+# Login and registration hash passwords in a pool of POOL_SIZE processes per
+# server process (0 hashes on the request thread). Requests wait up to
+# QUEUE_TIMEOUT seconds for a free process, at most MAX_QUEUE of them at a time
+PASSWORD_HASHING = {
+    'POOL_SIZE': config('PASSWORD_HASHING_POOL_SIZE', default=2, cast=int),
+    'MAX_QUEUE': config('PASSWORD_HASHING_MAX_QUEUE', default=200, cast=int),
+    'QUEUE_TIMEOUT': config('PASSWORD_HASHING_QUEUE_TIMEOUT', default=10, cast=float),
+}
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'accounts.authentication.RoleJWTAuthentication'
+        if JWT_ROLE_AUTHENTICATION else
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
@@ -136,6 +230,7 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.RoleTokenRefreshSerializer',
 }
 
 # CORS Settings
@@ -186,7 +281,8 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@exammaster.com'
 
 # Authentication backends
+# EmailBackend is a ModelBackend for USERNAME_FIELD = 'email'; listing
+# ModelBackend too would check every wrong password a second time
 AUTHENTICATION_BACKENDS = [
     'accounts.backends.EmailBackend',  # Custom email authentication backend
-    'django.contrib.auth.backends.ModelBackend',  # Default username authentication backend
 ]
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""
+Helpers for compressed and streamed responses.
+"""
+import zlib
+
+def accepted_encodings(header):
+    """Return the content codings a client accepts from its Accept-Encoding header"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def batched(lines, size=64 * 1024):
+    """Join small lines into chunks of about size characters"""
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk).encode()
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk).encode()
+
+def gzipped(chunks):
+    """Compress a stream of byte chunks into a gzip stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,121 @@
+"""
+Admission control for exam-start stampedes.
+
+Each protected resource (one exam's take endpoint, or the list of available
+exams) gets a token bucket that admits up to ``rate`` requests per second.
+Requests over the limit are answered with 429 right away instead of piling
+onto the database or holding a worker. The first ``queue_size`` of them in a
+second are given a place in a later refill through ``Retry-After``, so they
+come back spread out; the rest get a longer, jittered ``Retry-After``.
+
+The checks are DRF throttles, so they run after authentication and
+permissions and anonymous or forbidden requests never use up a student's
+place. Counters live in the Django cache, so the limits hold across worker
+processes when a shared cache backend is configured.
+"""
+import random
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+LIMITS_CACHE_TIMEOUT = 30  # seconds
+
+def _incr(key, delta=1, timeout=60):
+    """Atomically add delta to a cache counter, creating it when missing"""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The counter expired between add() and incr()
+        cache.add(key, 0, timeout)
+        return cache.incr(key, delta)
+
+def window_key(key, window):
+    return f'admission:{key}:{window}'
+
+def queue_key(key, window):
+    return f'admission_queue:{key}:{window}'
+
+def exam_limits_key(exam_id):
+    return f'admission_limits:{exam_id}'
+
+def default_limits():
+    return settings.EXAM_ADMISSION['RATE'], settings.EXAM_ADMISSION['QUEUE_SIZE']
+
+def get_exam_limits(exam_id):
+    """Return (rate, queue_size) for an exam, using a short-lived cached copy"""
+    limits = cache.get(exam_limits_key(exam_id))
+    if limits is None:
+        from .models import Exam
+
+        rate, queue_size = default_limits()
+        row = Exam.objects.filter(pk=exam_id).values_list('admission_rate', 'admission_queue_size').first()
+        if row is not None:
+            rate = row[0] if row[0] is not None else rate
+            queue_size = row[1] if row[1] is not None else queue_size
+        limits = (rate, queue_size)
+        cache.set(exam_limits_key(exam_id), limits, LIMITS_CACHE_TIMEOUT)
+    return limits
+
+def forget_exam_limits(exam_id):
+    cache.delete(exam_limits_key(exam_id))
+
+def try_acquire(key, rate):
+    """Take a token from the current one-second refill window"""
+    return _incr(window_key(key, int(time.time())), timeout=5) <= rate
+
+def admit(key, rate, queue_size):
+    """Return None if a request may proceed, else the seconds it should wait"""
+    if try_acquire(key, rate):
+        return None
+
+    position = _incr(queue_key(key, int(time.time())), timeout=5)
+    if position <= queue_size:
+        # Send each waiting client to a later refill, rate at a time
+        return 1 + (position - 1) // rate
+    base = settings.EXAM_ADMISSION['RETRY_AFTER']
+    return random.randint(base, base * 2)
+
+def admission_status(key, rate, queue_size):
+    """Current admission state of a resource"""
+    window = int(time.time())
+    return {
+        'rate': rate,
+        'queue_size': queue_size,
+        'admitted_this_second': cache.get(window_key(key, window), 0),
+        'queue_depth': cache.get(queue_key(key, window), 0),
+    }
+
+class AdmissionThrottle(BaseThrottle):
+    """Base throttle admitting requests through a resource's token bucket"""
+
+    def get_key(self, view):
+        raise NotImplementedError
+
+    def get_limits(self, view):
+        return default_limits()
+
+    def allow_request(self, request, view):
+        if not settings.EXAM_ADMISSION['ENABLED']:
+            return True
+        self.retry_after = admit(self.get_key(view), *self.get_limits(view))
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
+
+class ExamAdmissionThrottle(AdmissionThrottle):
+    """Admission to a per-exam view taking a pk, using the exam's limits"""
+
+    def get_key(self, view):
+        return f'exam:{view.kwargs["pk"]}'
+
+    def get_limits(self, view):
+        return get_exam_limits(view.kwargs['pk'])
+
+class AvailableExamsThrottle(AdmissionThrottle):
+    """Admission to the list of available exams, using the default limits"""
+
+    def get_key(self, view):
+        return 'available'
@@ -0,0 +1,81 @@
+"""
+Compiled per-exam answer keys.
+
+A key maps question id to an AnswerKeyEntry holding the question type, its
+points and a bitmask of its correct options. Each option of a question owns
+one bit, assigned by option order, so grading a selection is a single integer
+comparison. Legacy selections made of option texts are resolved to option ids
+through the same entry.
+
+Keys are built from the database once per exam content version and cached
+in process memory and in the Django cache (see exams.versioned_cache).
+"""
+from collections import namedtuple
+from django.conf import settings
+from questions.models import QuestionOption
+from .models import ExamQuestion
+from .versioned_cache import get_versioned
+
+class AnswerKeyEntry(namedtuple('AnswerKeyEntry', ['type', 'points', 'correct_mask', 'option_bits', 'option_ids_by_text'])):
+    """Answer key for a single question"""
+    __slots__ = ()
+
+    def resolve(self, selected_options):
+        """
+        Turn a selection of option ids (or legacy option texts) into option ids
+        and a bitmask. Options that do not belong to the question set a bit
+        outside the question's range, so they can never match the key.
+        """
+        unknown_bit = 1 << len(self.option_bits)
+        option_ids = []
+        mask = 0
+        for selected in selected_options:
+            if isinstance(selected, str):
+                selected = self.option_ids_by_text.get(selected, 0)
+            option_ids.append(selected)
+            mask |= self.option_bits.get(selected, unknown_bit)
+        return option_ids, mask
+
+    def grade(self, selected_options):
+        """Return the resolved option ids and whether the selection is correct"""
+        option_ids, mask = self.resolve(selected_options)
+        if self.type == 'single-choice' and len(option_ids) != 1:
+            return option_ids, False
+        return option_ids, mask == self.correct_mask
+
+def build_answer_key(exam_id):
+    """Compile the answer key for an exam straight from the database"""
+    option_bits = {}
+    option_ids_by_text = {}
+    correct_masks = {}
+    for option_id, question_id, text, is_correct in QuestionOption.objects.filter(
+        question__examquestion__exam_id=exam_id
+    ).order_by('question_id', 'order', 'id').values_list('id', 'question_id', 'text', 'is_correct'):
+        bits = option_bits.setdefault(question_id, {})
+        bit = 1 << len(bits)
+        bits[option_id] = bit
+        option_ids_by_text.setdefault(question_id, {}).setdefault(text, option_id)
+        if is_correct:
+            correct_masks[question_id] = correct_masks.get(question_id, 0) | bit
+
+    return {
+        question_id: AnswerKeyEntry(
+            question_type,
+            points,
+            correct_masks.get(question_id, 0),
+            option_bits.get(question_id, {}),
+            option_ids_by_text.get(question_id, {})
+        )
+        for question_id, question_type, points in ExamQuestion.objects.filter(
+            exam_id=exam_id
+        ).values_list('question_id', 'question__type', 'question__points')
+    }
+
+def get_answer_key(exam):
+    """Return the compiled answer key for the current content version of an exam"""
+    return get_versioned(
+        'exam_answer_key',
+        exam,
+        lambda exam: build_answer_key(exam.pk),
+        settings.ANSWER_KEY_CACHE_TIMEOUT
+    )
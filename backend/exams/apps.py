@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ExamsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'exams' 
\ No newline at end of file
+    name = 'exams'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,144 @@
+"""
+Random exam assembly from a blueprint.
+
+A blueprint lists sections, each asking for a number of questions of a
+subject, optionally of a given type and points value, and may set a target
+for the exam's total marks. Questions are drawn without ORDER BY RANDOM():
+a section with few matching questions loads its ids (an index-only scan)
+and samples them in memory, a larger one guesses random ids in its id range
+and keeps those that exist and match, which is rejection sampling on the
+primary key and stays uniform however sparse the ids are. When the drawn
+total misses the target, questions of sections without a fixed points value
+are swapped for ones worth more or fewer points.
+"""
+import random
+from django.db.models import Count, Max, Min
+from questions.models import Question
+
+# Sections with at most this many matching questions are sampled in memory
+POOL_SIZE = 5000
+# Random ids checked per query, and queries tried before loading the pool
+MAX_CANDIDATES = 500
+MAX_ROUNDS = 20
+
+class BlueprintError(Exception):
+    pass
+
+def section_queryset(section):
+    questions = Question.objects.filter(subject_id=section['subject'].pk)
+    if section.get('type'):
+        questions = questions.filter(type=section['type'])
+    if section.get('points'):
+        questions = questions.filter(points=section['points'])
+    return questions
+
+def sample_ids(questions, count, rng, exclude=()):
+    """Draw count distinct random ids from a question queryset"""
+    if exclude:
+        questions = questions.exclude(id__in=exclude)
+    stats = questions.aggregate(available=Count('id'), low=Min('id'), high=Max('id'))
+    available = stats['available']
+    if available < count:
+        return None
+    if not count:
+        return []
+    if available <= POOL_SIZE:
+        return rng.sample(list(questions.values_list('id', flat=True)), count)
+
+    low, high = stats['low'], stats['high']
+    density = available / (high - low + 1)
+    picked = set()
+    for _ in range(MAX_ROUNDS):
+        needed = count - len(picked)
+        if needed <= 0:
+            break
+        guesses = min(int(needed / density * 1.5) + 8, MAX_CANDIDATES)
+        candidates = {rng.randint(low, high) for _ in range(guesses)} - picked
+        picked.update(questions.filter(id__in=candidates).values_list('id', flat=True))
+    if len(picked) < count:
+        return rng.sample(list(questions.values_list('id', flat=True)), count)
+    # Every drawn id was equally likely, so is every subset of them
+    return rng.sample(sorted(picked), count)
+
+def assemble(sections, total_marks=None, exclude_ids=(), seed=None):
+    """Draw the questions of a blueprint and return (question ids, total marks, section reports)"""
+    rng = random.Random(seed)
+    chosen = set(exclude_ids)
+    drawn = []
+    for section in sections:
+        ids = sample_ids(section_queryset(section), section['count'], rng, chosen)
+        if ids is None:
+            raise BlueprintError(
+                f"Subject {section['subject'].name} has fewer than {section['count']} matching questions"
+            )
+        chosen.update(ids)
+        drawn.append(ids)
+
+    points = dict(Question.objects.filter(
+        id__in=[question_id for ids in drawn for question_id in ids]
+    ).values_list('id', 'points'))
+    total = sum(points.values())
+    if total_marks is not None and total != total_marks:
+        total = _adjust_total(sections, drawn, points, total_marks, rng, chosen)
+        if total != total_marks:
+            raise BlueprintError(
+                f"Could not reach {total_marks} total marks with this blueprint (closest: {total})"
+            )
+
+    reports = [
+        {
+            'subject': section['subject'].pk,
+            'type': section.get('type'),
+            'points': section.get('points'),
+            'count': len(ids),
+            'total_marks': sum(points[question_id] for question_id in ids),
+        }
+        for section, ids in zip(sections, drawn)
+    ]
+    return [question_id for ids in drawn for question_id in ids], total, reports
+
+def _adjust_total(sections, drawn, points, total_marks, rng, chosen):
+    """Swap questions of sections without fixed points until the total is reached, if possible"""
+    total = sum(points.values())
+    flexible = [index for index, section in enumerate(sections) if not section.get('points')]
+    values = {
+        index: set(section_queryset(sections[index]).values_list('points', flat=True).distinct())
+        for index in flexible
+    }
+    while total != total_marks:
+        # Plan the swaps first, so that each section and points value is drawn once
+        swaps = {}
+        planned = total
+        slots = [(index, position) for index in flexible for position in range(len(drawn[index]))]
+        rng.shuffle(slots)
+        for index, position in slots:
+            difference = total_marks - planned
+            if not difference:
+                break
+            if not values[index]:
+                continue
+            current = points[drawn[index][position]]
+            # The replacement value that brings the total closest to the target
+            target = min(values[index], key=lambda value: abs(difference - (value - current)))
+            if abs(difference - (target - current)) < abs(difference):
+                swaps.setdefault((index, target), []).append(position)
+                planned += target - current
+        if not swaps:
+            break
+
+        for (index, target), positions in swaps.items():
+            replacements = sample_ids(
+                section_queryset(sections[index]).filter(points=target), len(positions), rng, chosen
+            )
+            if replacements is None:
+                # Too few questions left with this value, plan again without it
+                values[index].discard(target)
+                continue
+            for position, replacement in zip(positions, replacements):
+                current = points[drawn[index][position]]
+                chosen.discard(drawn[index][position])
+                chosen.add(replacement)
+                drawn[index][position] = replacement
+                points[replacement] = target
+                total += target - current
+    return total
@@ -0,0 +1 @@
+# Management commands for exams app 
\ No newline at end of file
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from exams.models import Exam
+from exams.snapshots import build_snapshot
+
+class Command(BaseCommand):
+    help = 'Build the student payload snapshots of exams'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, nargs='+', dest='exam_ids',
+                            help='Only rebuild these exams')
+        parser.add_argument('--published-only', action='store_true',
+                            help='Skip exams that are not published')
+        parser.add_argument('--force', action='store_true',
+                            help='Create a new snapshot version even if the current one exists')
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.all()
+        if options['exam_ids']:
+            exams = exams.filter(pk__in=options['exam_ids'])
+        if options['published_only']:
+            exams = exams.filter(is_published=True)
+
+        for exam in exams.iterator():
+            if options['force']:
+                # Snapshots are immutable, so a forced rebuild moves the exam
+                # to a new content version
+                exam.save(update_fields=['content_version'])
+            snapshot = build_snapshot(exam)
+            self.stdout.write(f'{exam.title}: snapshot v{snapshot.version}')
+
+        self.stdout.write(self.style.SUCCESS('Exam snapshots rebuilt'))
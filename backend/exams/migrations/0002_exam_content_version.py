@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:18
+
+from django.db import migrations, models
+import exams.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='content_version',
+            field=models.CharField(default=exams.models.new_content_version, editable=False, help_text='Changes whenever the exam, its questions or their options change', max_length=32),
+        ),
+    ]
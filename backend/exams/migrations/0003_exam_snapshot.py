@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_exam_content_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('content_version', models.CharField(max_length=32)),
+                ('etag', models.CharField(max_length=100)),
+                ('body_gzip', models.BinaryField()),
+                ('body_br', models.BinaryField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='exams.exam')),
+            ],
+            options={
+                'ordering': ['exam', '-version'],
+                'unique_together': {('exam', 'version'), ('exam', 'content_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_exam_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='admission_queue_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Students allowed to wait for admission (empty uses the default)', null=True),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='admission_rate',
+            field=models.PositiveIntegerField(blank=True, help_text='Students admitted per second to the take endpoint (empty uses the default)', null=True),
+        ),
+    ]
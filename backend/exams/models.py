@@ -1,10 +1,15 @@
-from django.db import models
+import uuid
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from questions.models import Question
 
 User = get_user_model()
 
+def new_content_version():
+    """Return a fresh, never reused content version token"""
+    return uuid.uuid4().hex
+
 class Exam(models.Model):
     """Model for exams"""
     title = models.CharField(max_length=200)
@@ -23,21 +28,96 @@ class Exam(models.Model):
     is_published = models.BooleanField(default=False)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_exams')
     questions = models.ManyToManyField(Question, through='ExamQuestion')
+    shuffle_questions = models.BooleanField(
+        default=False,
+        help_text="Give every student their own question order"
+    )
+    shuffle_options = models.BooleanField(
+        default=False,
+        help_text="Give every student their own option order"
+    )
+    admission_rate = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Students admitted per second to the take endpoint (empty uses the default)"
+    )
+    admission_queue_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Students allowed to wait for admission (empty uses the default)"
+    )
+    content_version = models.CharField(
+        max_length=32,
+        default=new_content_version,
+        editable=False,
+        help_text="Changes whenever the exam, its questions or their options change"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title
     
-    def calculate_total_marks(self):
+    def save(self, *args, **kwargs):
+        # Every save invalidates whatever was cached for the previous version
+        self.content_version = new_content_version()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'content_version'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def bump_content_version(cls, **filters):
+        """Invalidate cached data for every exam matching the given filters"""
+        return cls.objects.filter(**filters).update(content_version=new_content_version())
+    
+    def calculate_total_marks(self, save=True):
         """Calculate total marks for the exam"""
-        total = sum(eq.question.points for eq in self.exam_questions.all())
+        total = self.exam_questions.aggregate(total=models.Sum('question__points'))['total'] or 0
         self.total_marks = total
-        self.save()
+        if save:
+            self.save()
         return total
     
+    def set_questions(self, question_ids):
+        """Make the exam's questions exactly question_ids, in that order
+        
+        Only the difference to the current questions is written: new questions
+        are bulk created, removed ones deleted and moved ones get their order
+        bulk updated. Callers save the exam afterwards, which also bumps its
+        content version since none of this sends signals.
+        """
+        positions = {question_id: order for order, question_id in enumerate(question_ids, start=1)}
+        existing = list(ExamQuestion.objects.filter(exam=self).only('id', 'question_id', 'order'))
+        
+        removed = [row.pk for row in existing if row.question_id not in positions]
+        moved = []
+        for row in existing:
+            order = positions.pop(row.question_id, None)
+            if order is not None and row.order != order:
+                row.order = order
+                moved.append(row)
+        
+        with transaction.atomic():
+            if removed:
+                # delete() would collect the rows and send post_delete for each
+                # one, and exams.signals bumps the content version per row. The
+                # caller saves the exam, which bumps it once, and nothing
+                # references exam questions, so one raw DELETE is enough
+                ExamQuestion.objects.filter(pk__in=removed)._raw_delete(ExamQuestion.objects.db)
+            if moved:
+                ExamQuestion.objects.bulk_update(moved, ['order'], batch_size=500)
+            ExamQuestion.objects.bulk_create([
+                ExamQuestion(exam=self, question_id=question_id, order=order)
+                for question_id, order in positions.items()
+            ])
+        return bool(removed or moved or positions)
+    
     @property
     def questions_count(self):
+        # List querysets annotate the count to avoid one query per exam
+        if hasattr(self, 'annotated_questions_count'):
+            return self.annotated_questions_count
         return self.questions.count()
     
     class Meta:
@@ -54,4 +134,21 @@ class ExamQuestion(models.Model):
         ordering = ['order']
     
     def __str__(self):
-        return f"{self.exam.title} - {self.question.text[:30]}..." 
\ No newline at end of file
+        return f"{self.exam.title} - {self.question.text[:30]}..."
+
+class ExamSnapshot(models.Model):
+    """Immutable, pre-compressed copy of the payload students get for an exam"""
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='snapshots')
+    version = models.PositiveIntegerField()
+    content_version = models.CharField(max_length=32)
+    etag = models.CharField(max_length=100)
+    body_gzip = models.BinaryField()
+    body_br = models.BinaryField(null=True, blank=True)  # Only when brotli is installed
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = (('exam', 'version'), ('exam', 'content_version'))
+        ordering = ['exam', '-version']
+    
+    def __str__(self):
+        return f"{self.exam.title} - v{self.version}"
@@ -0,0 +1,35 @@
+"""
+Pre-rendered exam payload for students taking an exam.
+
+The payload is identical for every student, so it is serialized once per
+exam content version and served as pre-encoded JSON bytes with an ETag.
+"""
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from .models import Exam, ExamQuestion
+from .serializers import ExamTakeSerializer
+from .versioned_cache import get_versioned
+
+def take_payload_data(exam):
+    """Serialize an exam for students, with one query per related table"""
+    exam = Exam.objects.prefetch_related(
+        Prefetch(
+            'exam_questions',
+            queryset=ExamQuestion.objects.select_related(
+                'question__subject',
+                'question__author'
+            ).prefetch_related('question__options')
+        )
+    ).get(pk=exam.pk)
+    return ExamTakeSerializer(exam).data
+
+def render_take_payload(exam):
+    """Serialize an exam for students, returning (body, etag)"""
+    body = JSONRenderer().render(take_payload_data(exam))
+    etag = f'"{exam.pk}-{exam.content_version}"'
+    return body, etag
+
+def get_take_payload(exam):
+    """Return (body, etag) of the student payload for the exam's current version"""
+    return get_versioned('exam_take_payload', exam, render_take_payload, settings.EXAM_PAYLOAD_CACHE_TIMEOUT)
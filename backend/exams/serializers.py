@@ -1,7 +1,26 @@
 from rest_framework import serializers
 from django.utils import timezone
+from django.db.models import prefetch_related_objects
 from .models import Exam, ExamQuestion
-from questions.serializers import QuestionSerializer
+from questions.models import Subject, Question
+from questions.serializers import QuestionSerializer, StudentQuestionSerializer
+
+# Everything ExamSerializer renders for an exam's questions
+EXAM_QUESTIONS_PREFETCH = [
+    'exam_questions__question__subject',
+    'exam_questions__question__author',
+    'exam_questions__question__options'
+]
+
+def validate_question_id_list(question_ids):
+    """Reject repeated and unknown question ids"""
+    if len(set(question_ids)) != len(question_ids):
+        raise serializers.ValidationError("A question can only be added to an exam once")
+    found = set(Question.objects.filter(id__in=question_ids).values_list('id', flat=True))
+    unknown = [question_id for question_id in question_ids if question_id not in found]
+    if unknown:
+        raise serializers.ValidationError(f"Unknown question ids: {unknown}")
+    return question_ids
 
 class ExamQuestionSerializer(serializers.ModelSerializer):
     """Serializer for ExamQuestion model"""
@@ -26,8 +45,9 @@ class ExamSerializer(serializers.ModelSerializer):
         model = Exam
         fields = [
             'id', 'title', 'description', 'duration', 'total_marks', 'pass_percentage',
-            'start_time', 'end_time', 'is_published', 'created_by', 'created_by_name',
-            'questions_count', 'exam_questions', 'question_ids', 'created_at', 'updated_at'
+            'start_time', 'end_time', 'is_published', 'shuffle_questions', 'shuffle_options',
+            'created_by', 'created_by_name', 'questions_count', 'exam_questions', 'question_ids',
+            'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_by', 'total_marks', 'created_at', 'updated_at']
     
@@ -45,17 +65,17 @@ class ExamSerializer(serializers.ModelSerializer):
         
         return data
     
+    def validate_question_ids(self, value):
+        return validate_question_id_list(value)
+    
     def create(self, validated_data):
         question_ids = validated_data.pop('question_ids', [])
         exam = Exam.objects.create(**validated_data)
         
         # Add questions to exam
-        for i, question_id in enumerate(question_ids):
-            ExamQuestion.objects.create(
-                exam=exam,
-                question_id=question_id,
-                order=i + 1
-            )
+        if question_ids:
+            exam.set_questions(question_ids)
+        exam.annotated_questions_count = len(question_ids)
         
         # Calculate total marks
         exam.calculate_total_marks()
@@ -67,25 +87,23 @@ class ExamSerializer(serializers.ModelSerializer):
         # Update exam fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
         
-        # Update questions if provided
+        # Update questions if provided, saving the exam once with its new total
         if question_ids is not None:
-            # Remove existing questions
-            instance.exam_questions.all().delete()
+            instance.set_questions(question_ids)
+            instance.calculate_total_marks(save=False)
             
-            # Add new questions
-            for i, question_id in enumerate(question_ids):
-                ExamQuestion.objects.create(
-                    exam=instance,
-                    question_id=question_id,
-                    order=i + 1
-                )
-            
-            # Recalculate total marks
-            instance.calculate_total_marks()
+            # The count annotated by the view no longer holds
+            instance.annotated_questions_count = len(question_ids)
+        instance.save()
         
         return instance
+    
+    def to_representation(self, instance):
+        # Created and updated exams come back without the view's prefetch
+        if 'exam_questions' not in getattr(instance, '_prefetched_objects_cache', {}):
+            prefetch_related_objects([instance], *EXAM_QUESTIONS_PREFETCH)
+        return super().to_representation(instance)
 
 class ExamListSerializer(serializers.ModelSerializer):
     """Simplified serializer for exam lists"""
@@ -124,13 +142,65 @@ class StudentExamSerializer(serializers.ModelSerializer):
             return int(remaining.total_seconds())
         return 0
 
+class StudentExamQuestionSerializer(serializers.ModelSerializer):
+    """Serializer for exam questions shown to students"""
+    question = StudentQuestionSerializer(read_only=True)
+    
+    class Meta:
+        model = ExamQuestion
+        fields = ['id', 'question', 'order']
+
 class ExamTakeSerializer(serializers.ModelSerializer):
-    """Serializer for taking an exam (includes questions)"""
-    exam_questions = ExamQuestionSerializer(many=True, read_only=True)
+    """Serializer for taking an exam (includes questions, without answers)"""
+    exam_questions = StudentExamQuestionSerializer(many=True, read_only=True)
     
     class Meta:
         model = Exam
         fields = [
             'id', 'title', 'description', 'duration', 'total_marks',
             'start_time', 'end_time', 'exam_questions'
-        ] 
\ No newline at end of file
+        ]
+
+class ExamReorderSerializer(serializers.Serializer):
+    """Serializer for a new order of an exam's questions"""
+    question_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    
+    def validate_question_ids(self, value):
+        current = set(self.context['exam'].exam_questions.values_list('question_id', flat=True))
+        if len(value) != len(current) or set(value) != current:
+            raise serializers.ValidationError("List every question of the exam exactly once")
+        return value
+
+class BlueprintSectionSerializer(serializers.Serializer):
+    """One section of an exam blueprint"""
+    subject = serializers.PrimaryKeyRelatedField(queryset=Subject.objects.all())
+    type = serializers.ChoiceField(choices=Question.QUESTION_TYPES, required=False)
+    points = serializers.IntegerField(min_value=1, required=False)
+    count = serializers.IntegerField(min_value=1, max_value=1000)
+
+class ExamBlueprintSerializer(serializers.Serializer):
+    """Serializer for a blueprint to draw an exam's questions from"""
+    sections = BlueprintSectionSerializer(many=True, allow_empty=False)
+    total_marks = serializers.IntegerField(min_value=1, required=False)
+    exclude_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    seed = serializers.IntegerField(required=False)
+    
+    def validate(self, data):
+        total_marks = data.get('total_marks')
+        sections = data['sections']
+        if total_marks is not None and all(section.get('points') for section in sections):
+            fixed_total = sum(section['points'] * section['count'] for section in sections)
+            if fixed_total != total_marks:
+                raise serializers.ValidationError(
+                    f"The sections are worth {fixed_total} marks, not {total_marks}"
+                )
+        return data
+
+class ExamAdmissionSerializer(serializers.ModelSerializer):
+    """Serializer for an exam's admission limits"""
+    admission_rate = serializers.IntegerField(min_value=1, allow_null=True, required=False)
+    admission_queue_size = serializers.IntegerField(min_value=0, allow_null=True, required=False)
+    
+    class Meta:
+        model = Exam
+        fields = ['admission_rate', 'admission_queue_size']
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from questions.models import Question, QuestionOption
+from .models import Exam, ExamQuestion
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Invalidate every exam that uses the question"""
+    Exam.bump_content_version(exam_questions__question_id=instance.pk)
+
+@receiver([post_save, post_delete], sender=QuestionOption)
+def question_option_changed(sender, instance, **kwargs):
+    """Invalidate every exam that uses the option's question"""
+    Exam.bump_content_version(exam_questions__question_id=instance.question_id)
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def exam_question_changed(sender, instance, **kwargs):
+    """Invalidate the exam the question was added to or removed from"""
+    Exam.bump_content_version(pk=instance.exam_id)
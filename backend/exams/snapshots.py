@@ -0,0 +1,74 @@
+"""
+Immutable, pre-compressed exam snapshots.
+
+Publishing an exam stores the student payload as gzip (and, when the optional
+``brotli`` package is installed, brotli) blobs in an ExamSnapshot row tied to
+the exam's content version. The take endpoint serves those bytes as they are,
+so requests never serialize or compress anything. Edits produce a new content
+version and therefore a new snapshot version; old snapshots are never
+modified.
+"""
+import gzip
+from collections import namedtuple
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from exammaster.streaming import accepted_encodings
+from .models import ExamSnapshot
+from .payload import get_take_payload
+from .versioned_cache import get_versioned
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressed bodies kept in memory, keyed by Content-Encoding
+CachedSnapshot = namedtuple('CachedSnapshot', ['version', 'etag', 'bodies'])
+
+def build_snapshot(exam):
+    """Return the snapshot for the exam's current content version, creating it if needed"""
+    snapshot = ExamSnapshot.objects.filter(exam=exam, content_version=exam.content_version).first()
+    if snapshot is not None:
+        return snapshot
+
+    body, etag = get_take_payload(exam)
+    body_gzip = gzip.compress(body, compresslevel=9)
+    body_br = brotli.compress(body) if brotli is not None else None
+
+    latest = ExamSnapshot.objects.filter(exam=exam).aggregate(latest=Max('version'))['latest'] or 0
+    try:
+        with transaction.atomic():
+            return ExamSnapshot.objects.create(
+                exam=exam,
+                version=latest + 1,
+                content_version=exam.content_version,
+                etag=etag,
+                body_gzip=body_gzip,
+                body_br=body_br
+            )
+    except IntegrityError:
+        # Another worker built the same snapshot first
+        return ExamSnapshot.objects.get(exam=exam, content_version=exam.content_version)
+
+def load_snapshot(exam):
+    """Build or fetch the snapshot and keep only what serving needs"""
+    snapshot = build_snapshot(exam)
+    bodies = {'gzip': bytes(snapshot.body_gzip)}
+    if snapshot.body_br is not None:
+        bodies['br'] = bytes(snapshot.body_br)
+    return CachedSnapshot(snapshot.version, snapshot.etag, bodies)
+
+def get_snapshot(exam):
+    """Return the cached snapshot for the exam's current content version"""
+    return get_versioned('exam_snapshot', exam, load_snapshot, settings.EXAM_PAYLOAD_CACHE_TIMEOUT)
+
+def choose_body(snapshot, exam, accept_encoding):
+    """Return (body, content encoding) of the best representation for a client"""
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in ('br', 'gzip'):
+        if encoding in snapshot.bodies and (encoding in accepted or '*' in accepted):
+            return snapshot.bodies[encoding], encoding
+
+    # Clients that accept no compression get the uncompressed cached payload
+    return get_take_payload(exam)[0], None
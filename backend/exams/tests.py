@@ -0,0 +1,238 @@
+import gzip
+import json
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from questions.models import Subject, Question, QuestionOption
+from .answer_key import get_answer_key
+from .models import Exam, ExamQuestion
+from .payload import take_payload_data
+from .variants import render_variant, variant_seed
+
+class ExamTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pw', role='teacher'
+        )
+        cls.student = User.objects.create_user(
+            username='student', email='student@example.com', password='pw', role='student'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def create_exam(self, title='Exam'):
+        now = timezone.now()
+        return Exam.objects.create(
+            title=title, duration=30, is_published=True, created_by=self.teacher,
+            start_time=now - timedelta(minutes=5), end_time=now + timedelta(days=1)
+        )
+
+# One refill window for the whole test, so requests cannot spill into the next
+@mock.patch('exams.admission.time.time', return_value=1_000_000.0)
+@override_settings(EXAM_ADMISSION={'ENABLED': True, 'RATE': 1, 'QUEUE_SIZE': 1, 'RETRY_AFTER': 5})
+class AdmissionTests(ExamTestCase):
+    def test_requests_over_the_rate_get_retry_after(self, _):
+        exam = self.create_exam()
+        client = self.client_for(self.student)
+        self.assertEqual(client.get(f'/api/exams/take/{exam.pk}/').status_code, 200)
+
+        queued = client.get(f'/api/exams/take/{exam.pk}/')
+        self.assertEqual(queued.status_code, 429)
+        self.assertEqual(queued['Retry-After'], '1')
+
+        turned_away = client.get(f'/api/exams/take/{exam.pk}/')
+        self.assertEqual(turned_away.status_code, 429)
+        self.assertIn(int(turned_away['Retry-After']), range(5, 11))
+
+    def test_unauthorized_requests_are_not_admitted(self, _):
+        self.assertEqual(APIClient().get('/api/exams/available/').status_code, 401)
+        self.assertEqual(self.client_for(self.teacher).get('/api/exams/available/').status_code, 403)
+        self.assertEqual(self.client_for(self.student).get('/api/exams/available/').status_code, 200)
+
+class SetQuestionsTests(ExamTestCase):
+    def test_questions_are_added_removed_and_reordered(self):
+        subject = Subject.objects.create(name='Mathematics')
+        first, second, third = Question.objects.bulk_create([
+            Question(text=f'Question {number}', subject=subject, type='single-choice', author=self.teacher)
+            for number in range(3)
+        ])
+        exam = self.create_exam()
+        exam.set_questions([first.pk, second.pk])
+
+        self.assertTrue(exam.set_questions([third.pk, first.pk]))
+        self.assertEqual(
+            list(exam.exam_questions.values_list('question_id', 'order')),
+            [(third.pk, 1), (first.pk, 2)]
+        )
+        self.assertFalse(exam.set_questions([third.pk, first.pk]))
+
+    def test_query_count_does_not_grow_with_removed_questions(self):
+        subject = Subject.objects.create(name='Mathematics')
+        questions = Question.objects.bulk_create([
+            Question(text=f'Question {number}', subject=subject, type='single-choice', author=self.teacher)
+            for number in range(300)
+        ])
+        exam = self.create_exam()
+        exam.set_questions([question.pk for question in questions])
+
+        # Existing rows, then one DELETE and one UPDATE of the moved rows in a savepoint
+        kept = [question.pk for question in reversed(questions[:10])]
+        with self.assertNumQueries(5):
+            exam.set_questions(kept)
+        self.assertEqual(list(exam.exam_questions.values_list('question_id', flat=True)), kept)
+
+class VariantTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        subject = Subject.objects.create(name='Mathematics')
+        questions = Question.objects.bulk_create([
+            Question(text=f'Question "{number}"\u2028', subject=subject, type='single-choice', author=self.teacher)
+            for number in range(5)
+        ])
+        QuestionOption.objects.bulk_create([
+            QuestionOption(question=question, text=text, is_correct=text == 'A', order=order)
+            for question in questions
+            for order, text in enumerate('ABCD', start=1)
+        ])
+        self.exam = self.create_exam()
+        self.exam.shuffle_questions = self.exam.shuffle_options = True
+        self.exam.set_questions([question.pk for question in questions])
+        self.exam.save()
+
+    def unordered(self, payload):
+        """The payload with its questions and options sorted by id and without order fields"""
+        for exam_question in payload['exam_questions']:
+            del exam_question['order']
+            options = exam_question['question']['options']
+            for option in options:
+                del option['order']
+            options.sort(key=lambda option: option['id'])
+        payload['exam_questions'].sort(key=lambda exam_question: exam_question['id'])
+        return payload
+
+    def test_variant_has_the_payload_in_another_order(self):
+        variant = json.loads(render_variant(self.exam, variant_seed(self.exam.pk, self.student.pk)))
+        self.assertEqual([question['order'] for question in variant['exam_questions']], [1, 2, 3, 4, 5])
+        expected = json.loads(json.dumps(take_payload_data(self.exam)))
+        self.assertEqual(self.unordered(variant), self.unordered(expected))
+
+    def test_compressed_variant_is_the_variant(self):
+        client = self.client_for(self.student)
+        response = client.get(f'/api/exams/take/{self.exam.pk}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(response.content),
+            render_variant(self.exam, variant_seed(self.exam.pk, self.student.pk))
+        )
+        again = client.get(f'/api/exams/take/{self.exam.pk}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(again.content, response.content)
+
+class ContentVersionTests(ExamTestCase):
+    """Edits reach the cached answer key and the students' payload through signals alone"""
+
+    def setUp(self):
+        super().setUp()
+        subject = Subject.objects.create(name='Mathematics')
+        self.question = Question.objects.create(
+            text='Question', subject=subject, type='single-choice', author=self.teacher
+        )
+        self.a = QuestionOption.objects.create(question=self.question, text='A', is_correct=True, order=1)
+        self.b = QuestionOption.objects.create(question=self.question, text='B', is_correct=False, order=2)
+        self.exam = self.create_exam()
+        self.exam.is_published = False
+        self.exam.set_questions([self.question.pk])
+        self.exam.save()
+        response = self.client_for(self.teacher).post(f'/api/exams/{self.exam.pk}/publish/')
+        self.assertEqual(response.status_code, 200)
+
+    def answer_key_grades(self, option):
+        self.exam.refresh_from_db()
+        return get_answer_key(self.exam)[self.question.pk].grade([option.pk])[1]
+
+    def take(self):
+        response = self.client_for(self.student).get(f'/api/exams/take/{self.exam.pk}/', HTTP_ACCEPT_ENCODING='gzip')
+        return json.loads(gzip.decompress(response.content))['exam_questions'][0]['question']
+
+    def test_question_update_through_the_api(self):
+        self.assertTrue(self.answer_key_grades(self.a))
+        response = self.client_for(self.teacher).patch(f'/api/questions/{self.question.pk}/', {
+            'text': 'Question, corrected',
+            'options': [
+                {'id': self.a.pk, 'text': 'A', 'is_correct': False, 'order': 1},
+                {'id': self.b.pk, 'text': 'B', 'is_correct': True, 'order': 2},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertFalse(self.answer_key_grades(self.a))
+        self.assertTrue(self.answer_key_grades(self.b))
+        self.assertEqual(self.take()['text'], 'Question, corrected')
+
+    def test_option_save_and_delete(self):
+        self.assertEqual([option['text'] for option in self.take()['options']], ['A', 'B'])
+        self.b.text = 'B, reworded'
+        self.b.save()
+        self.assertEqual([option['text'] for option in self.take()['options']], ['A', 'B, reworded'])
+
+        QuestionOption.objects.create(question=self.question, text='C', is_correct=False, order=3).delete()
+        removed_id = self.b.pk
+        self.b.delete()
+        self.assertEqual([option['text'] for option in self.take()['options']], ['A'])
+        self.exam.refresh_from_db()
+        self.assertNotIn(removed_id, get_answer_key(self.exam)[self.question.pk].option_bits)
+
+class ExamListQueryTests(ExamTestCase):
+    def add_exams(self, count):
+        """Add published exams with three questions each"""
+        subject = Subject.objects.create(name=f'Subject {Exam.objects.count()}')
+        questions = Question.objects.bulk_create([
+            Question(text=f'Question {number}', subject=subject, type='single-choice', author=self.teacher)
+            for number in range(3)
+        ])
+        now = timezone.now()
+        exams = Exam.objects.bulk_create([
+            Exam(
+                title=f'Exam {number}', duration=30, is_published=True, created_by=self.teacher,
+                start_time=now - timedelta(minutes=5), end_time=now + timedelta(days=1)
+            )
+            for number in range(count)
+        ])
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(exam=exam, question=question, order=order)
+            for exam in exams
+            for order, question in enumerate(questions)
+        ])
+        return exams
+
+    def assertQueriesConstant(self, client, url):
+        """Request url with 10 and with 1000 exams, expecting the same number of queries"""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get(url).status_code, 200)
+        self.add_exams(990)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(client.get(url).status_code, 200)
+
+    def test_exam_list(self):
+        self.add_exams(10)
+        self.assertQueriesConstant(self.client_for(self.teacher), '/api/exams/')
+
+    def test_available_exam_list(self):
+        self.add_exams(10)
+        self.assertQueriesConstant(self.client_for(self.student), '/api/exams/available/')
+
+    def test_exam_detail(self):
+        exam = self.add_exams(10)[0]
+        self.assertQueriesConstant(self.client_for(self.teacher), f'/api/exams/{exam.pk}/')
@@ -1,12 +1,18 @@
 from django.urls import path
 from . import views
+from submissions import views as submission_views
 
 urlpatterns = [
     # Teacher/Admin exam management
     path('', views.ExamListCreateView.as_view(), name='exam_list_create'),
     path('<int:pk>/', views.ExamDetailView.as_view(), name='exam_detail'),
+    path('assemble/', views.ExamAssembleView.as_view(), name='exam_assemble'),
     path('<int:pk>/publish/', views.publish_exam, name='publish_exam'),
     path('<int:pk>/unpublish/', views.unpublish_exam, name='unpublish_exam'),
+    path('<int:pk>/reorder/', views.reorder_exam_questions, name='reorder_exam_questions'),
+    path('<int:pk>/admission/', views.exam_admission, name='exam_admission'),
+    path('<int:pk>/stats/', submission_views.exam_statistics, name='exam_statistics'),
+    path('<int:pk>/item-analysis/', submission_views.exam_item_analysis, name='exam_item_analysis'),
     
     # Student exam access
     path('available/', views.StudentExamListView.as_view(), name='student_exam_list'),
@@ -0,0 +1,117 @@
+"""
+Per-student question and option order.
+
+Exams with shuffle_questions or shuffle_options give every student their own
+order without storing anything per student. The order comes from a seed
+derived from the exam id and student id (an HMAC with the SECRET_KEY, so a
+student cannot work out another student's order), and is applied to payload
+fragments that are rendered once per exam content version and cached: each
+question and each option is pre-encoded JSON, so a variant is a shuffle and a
+join over them, O(n) in the size of the exam. The ``order`` fields are
+rewritten to the student's order. Gzip-compressed variants are cached per
+student and exam version, since a student reloading the exam gets the same
+bytes.
+
+Answers refer to question and option ids, never to positions, so grading
+needs no mapping back to the exam's own order.
+"""
+import gzip
+import hashlib
+import hmac
+import json
+import random
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.utils import encoders
+from exammaster.streaming import accepted_encodings
+from .payload import take_payload_data
+from .versioned_cache import get_versioned
+
+def variant_seed(exam_id, student_id):
+    """Return the seed of a student's order for an exam"""
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f'exam-variant:{exam_id}:{student_id}'.encode(),
+        hashlib.sha256
+    ).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+def variant_etag(exam, seed):
+    return f'"{exam.pk}-{exam.content_version}-{seed:016x}"'
+
+def _encode(value):
+    """Encode a value like JSONRenderer, which would render None as nothing"""
+    text = json.dumps(value, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+def _members(data):
+    """Encode the members of a JSON object, without its braces"""
+    return b','.join(b'%s:%s' % (_encode(key), _encode(value)) for key, value in data.items())
+
+def render_take_fragments(exam):
+    """
+    Split the student payload into (head, questions), where every question is
+    (prefix, option fragments). Fragments are encoded member by member and
+    leave their object open, so the ``"order"`` member and the closing brace
+    are appended when a variant is assembled.
+    """
+    data = take_payload_data(exam)
+    exam_questions = data.pop('exam_questions')
+    head = b'{%s,"exam_questions":[' % _members(data)
+
+    questions = []
+    for exam_question in exam_questions:
+        question = dict(exam_question['question'])
+        options = question.pop('options')
+        prefix = b'{%s,"question":{%s,"options":[' % (
+            _members({'id': exam_question['id']}), _members(question)
+        )
+        option_fragments = tuple(
+            b'{%s' % _members({key: value for key, value in option.items() if key != 'order'})
+            for option in options
+        )
+        questions.append((prefix, option_fragments))
+    return head, tuple(questions)
+
+def get_take_fragments(exam):
+    return get_versioned('exam_take_fragments', exam, render_take_fragments, settings.EXAM_PAYLOAD_CACHE_TIMEOUT)
+
+def render_variant(exam, seed):
+    """Assemble the payload of one student's variant of an exam"""
+    head, questions = get_take_fragments(exam)
+    rng = random.Random(seed)
+
+    question_order = list(range(len(questions)))
+    if exam.shuffle_questions:
+        rng.shuffle(question_order)
+
+    parts = [head]
+    for position, index in enumerate(question_order, start=1):
+        prefix, options = questions[index]
+        option_order = list(range(len(options)))
+        if exam.shuffle_options:
+            rng.shuffle(option_order)
+        if position > 1:
+            parts.append(b',')
+        parts.append(prefix)
+        parts.append(b','.join(
+            b'%s,"order":%d}' % (options[option], option_position)
+            for option_position, option in enumerate(option_order, start=1)
+        ))
+        parts.append(b']},"order":%d}' % position)
+    parts.append(b']}')
+    return b''.join(parts)
+
+def variant_body(exam, seed, accept_encoding):
+    """Return (body, content encoding) of a student's variant for a client"""
+    accepted = accepted_encodings(accept_encoding)
+    if 'gzip' not in accepted and '*' not in accepted:
+        return render_variant(exam, seed), None
+
+    # Compressed once per student and exam version, not on every request
+    cache_key = f'exam_take_variant_gzip:{exam.pk}:{exam.content_version}:{seed:016x}'
+    body = cache.get(cache_key)
+    if body is None:
+        body = gzip.compress(render_variant(exam, seed), compresslevel=6)
+        cache.set(cache_key, body, settings.EXAM_PAYLOAD_CACHE_TIMEOUT)
+    return body, 'gzip'
@@ -0,0 +1,28 @@
+"""
+Two-level cache for data derived from an exam's content.
+
+Values are keyed by ``Exam.content_version``, which changes on every edit to
+the exam, its questions or their options, so entries never need explicit
+invalidation. Each worker keeps the latest value per exam in process memory
+and falls back to the Django cache shared by all workers before rebuilding.
+"""
+from django.core.cache import cache
+
+# (name, exam id) -> (content version, value)
+_local_values = {}
+
+def get_versioned(name, exam, build, timeout):
+    """Return build(exam) for the exam's current content version, cached"""
+    local_key = (name, exam.pk)
+    local = _local_values.get(local_key)
+    if local is not None and local[0] == exam.content_version:
+        return local[1]
+
+    cache_key = f'{name}:{exam.pk}:{exam.content_version}'
+    value = cache.get(cache_key)
+    if value is None:
+        value = build(exam)
+        cache.set(cache_key, value, timeout)
+
+    _local_values[local_key] = (exam.content_version, value)
+    return value
@@ -1,7 +1,10 @@
 from rest_framework import generics, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
+from django.db.models import Count
+from django.http import HttpResponse
 from django.utils import timezone
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import Exam
@@ -9,13 +12,27 @@ from .serializers import (
     ExamSerializer, 
     ExamListSerializer, 
     StudentExamSerializer,
-    ExamTakeSerializer
+    ExamReorderSerializer,
+    ExamBlueprintSerializer,
+    ExamAdmissionSerializer,
+    EXAM_QUESTIONS_PREFETCH
 )
+from .assembly import BlueprintError, assemble
+from .admission import AvailableExamsThrottle, ExamAdmissionThrottle
+from .snapshots import build_snapshot, choose_body, get_snapshot
+from .variants import variant_body, variant_etag, variant_seed
+from . import admission
 from accounts.permissions import IsTeacherOrAdmin, IsStudentUser
 
+def exam_list_queryset(queryset):
+    """Fetch author names and question counts with the exams themselves"""
+    return queryset.select_related('created_by').annotate(
+        annotated_questions_count=Count('exam_questions')
+    )
+
 class ExamListCreateView(generics.ListCreateAPIView):
     """List all exams or create a new exam (Teachers/Admins only)"""
-    queryset = Exam.objects.all()
+    queryset = exam_list_queryset(Exam.objects.all())
     permission_classes = [IsTeacherOrAdmin]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['is_published', 'created_by']
@@ -39,14 +56,19 @@ class ExamDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         # Teachers can only modify their own exams, admins can modify all
+        queryset = exam_list_queryset(Exam.objects.all())
+        if self.request.method == 'GET':
+            # Updates render the exam after saving it, and prefetch then
+            queryset = queryset.prefetch_related(*EXAM_QUESTIONS_PREFETCH)
         if self.request.user.is_admin:
-            return Exam.objects.all()
-        return Exam.objects.filter(created_by=self.request.user)
+            return queryset
+        return queryset.filter(created_by=self.request.user)
 
 class StudentExamListView(generics.ListAPIView):
     """List available exams for students"""
     serializer_class = StudentExamSerializer
     permission_classes = [IsStudentUser]
+    throttle_classes = [AvailableExamsThrottle]
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['title', 'description']
     ordering_fields = ['start_time', 'title']
@@ -54,10 +76,11 @@ class StudentExamListView(generics.ListAPIView):
     
     def get_queryset(self):
         # Only show published exams
-        return Exam.objects.filter(is_published=True)
+        return exam_list_queryset(Exam.objects.filter(is_published=True))
 
 @api_view(['GET'])
 @permission_classes([IsStudentUser])
+@throttle_classes([ExamAdmissionThrottle])
 def exam_detail_for_student(request, pk):
     """Get exam details for a student (without answers)"""
     try:
@@ -71,8 +94,30 @@ def exam_detail_for_student(request, pk):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        serializer = ExamTakeSerializer(exam)
-        return Response(serializer.data)
+        accept_encoding = request.headers.get('Accept-Encoding', '')
+        if exam.shuffle_questions or exam.shuffle_options:
+            # Each student gets their own order, assembled from cached fragments
+            seed = variant_seed(exam.pk, request.user.pk)
+            etag = variant_etag(exam, seed)
+        else:
+            # Every student gets the same pre-compressed snapshot bytes
+            snapshot = get_snapshot(exam)
+            etag = snapshot.etag
+        
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            if exam.shuffle_questions or exam.shuffle_options:
+                body, encoding = variant_body(exam, seed, accept_encoding)
+            else:
+                body, encoding = choose_body(snapshot, exam, accept_encoding)
+            response = HttpResponse(body, content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = 'private, no-cache'
+        return response
     
     except Exam.DoesNotExist:
         return Response(
@@ -96,6 +141,7 @@ def publish_exam(request, pk):
         
         exam.is_published = True
         exam.save()
+        build_snapshot(exam)
         
         return Response({'message': 'Exam published successfully'})
     
@@ -121,6 +167,7 @@ def unpublish_exam(request, pk):
         
         exam.is_published = False
         exam.save()
+        build_snapshot(exam)
         
         return Response({'message': 'Exam unpublished successfully'})
     
@@ -128,4 +175,95 @@ def unpublish_exam(request, pk):
         return Response(
             {'error': 'Exam not found'}, 
             status=status.HTTP_404_NOT_FOUND
-        ) 
\ No newline at end of file
+        )
+
+class ExamAssembleView(generics.GenericAPIView):
+    """Draw random questions for a new exam from a blueprint (Teachers/Admins only)"""
+    serializer_class = ExamBlueprintSerializer
+    permission_classes = [IsTeacherOrAdmin]
+    
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        blueprint = serializer.validated_data
+        try:
+            question_ids, total_marks, sections = assemble(
+                blueprint['sections'],
+                total_marks=blueprint.get('total_marks'),
+                exclude_ids=blueprint.get('exclude_ids', ()),
+                seed=blueprint.get('seed')
+            )
+        except BlueprintError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # question_ids can be sent as is to create the exam
+        return Response({
+            'question_ids': question_ids,
+            'total_marks': total_marks,
+            'sections': sections
+        })
+
+@api_view(['PUT'])
+@permission_classes([IsTeacherOrAdmin])
+def reorder_exam_questions(request, pk):
+    """Change the order of an exam's questions"""
+    try:
+        exam = Exam.objects.get(pk=pk)
+    except Exam.DoesNotExist:
+        return Response(
+            {'error': 'Exam not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Check permissions
+    if not request.user.is_admin and exam.created_by != request.user:
+        return Response(
+            {'error': 'Permission denied'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    serializer = ExamReorderSerializer(data=request.data, context={'exam': exam})
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    question_ids = serializer.validated_data['question_ids']
+    if exam.set_questions(question_ids):
+        # Total marks are unchanged, only the cached payloads are stale
+        Exam.bump_content_version(pk=pk)
+    
+    return Response({'message': 'Exam questions reordered successfully', 'question_ids': question_ids})
+
+@api_view(['GET', 'PATCH'])
+@permission_classes([IsTeacherOrAdmin])
+def exam_admission(request, pk):
+    """View or configure admission limits of an exam's take endpoint"""
+    try:
+        exam = Exam.objects.get(pk=pk)
+    except Exam.DoesNotExist:
+        return Response(
+            {'error': 'Exam not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Check permissions
+    if not request.user.is_admin and exam.created_by != request.user:
+        return Response(
+            {'error': 'Permission denied'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    if request.method == 'PATCH':
+        serializer = ExamAdmissionSerializer(exam, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Limits are not part of the exam content, so skip save() and keep
+        # the exam's caches and snapshot valid
+        Exam.objects.filter(pk=pk).update(**serializer.validated_data)
+        admission.forget_exam_limits(pk)
+    
+    data = admission.admission_status(f'exam:{pk}', *admission.get_exam_limits(pk))
+    data['exam_id'] = exam.id
+    return Response(data)
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class QuestionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'questions' 
\ No newline at end of file
+    name = 'questions' 
+    
+    def ready(self):
+        from . import signals  # noqa: F401
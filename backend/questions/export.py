@@ -0,0 +1,120 @@
+"""
+Streaming export of the question bank.
+
+Questions are read in chunks with their subject and options prefetched per
+chunk, and written as the JSON document of the question bank export (the
+format the importer reads back) or as NDJSON, one question per line. The
+"bank snapshot" format is a standalone SQLite database with subjects,
+questions and options tables, which is much smaller and faster to move
+between instances than JSON; the importer reads it back.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+from django.db.models import Prefetch
+from django.utils import timezone
+from exammaster.streaming import batched, gzipped
+from .models import Subject, QuestionOption
+
+CHUNK_SIZE = 2000
+FORMATS = ('json', 'ndjson', 'sqlite')
+SNAPSHOT_VERSION = 1
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE subjects (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, description TEXT NOT NULL);
+CREATE TABLE questions (
+    id INTEGER PRIMARY KEY, subject_id INTEGER NOT NULL REFERENCES subjects (id),
+    text TEXT NOT NULL, type TEXT NOT NULL, points INTEGER NOT NULL
+);
+CREATE TABLE options (
+    question_id INTEGER NOT NULL REFERENCES questions (id),
+    "order" INTEGER NOT NULL, text TEXT NOT NULL, is_correct INTEGER NOT NULL
+);
+CREATE INDEX options_question_idx ON options (question_id, "order");
+"""
+
+def question_records(questions):
+    """Yield questions in the export layout, reading them a chunk at a time"""
+    questions = questions.select_related('subject').prefetch_related(
+        Prefetch('options', queryset=QuestionOption.objects.order_by('order', 'id'))
+    ).order_by('id')
+    for question in questions.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'text': question.text,
+            'type': question.type,
+            'subject': question.subject.name,
+            'points': question.points,
+            'options': [
+                {'text': option.text, 'isCorrect': option.is_correct}
+                for option in question.options.all()
+            ],
+        }
+
+def json_lines(questions):
+    """Yield the export as one JSON document, with one question per line"""
+    yield '{"exportDate": %s, "totalQuestions": %d, "questions": [\n' % (
+        json.dumps(timezone.now().isoformat()), questions.count()
+    )
+    separator = ''
+    for record in question_records(questions):
+        yield separator + json.dumps(record)
+        separator = ',\n'
+    yield '\n]}\n'
+
+def ndjson_lines(questions):
+    for record in question_records(questions):
+        yield json.dumps(record) + '\n'
+
+def export_stream(questions, export_format, gzip=False):
+    """Return an iterator of byte chunks for a JSON or NDJSON export"""
+    lines = json_lines if export_format == 'json' else ndjson_lines
+    chunks = batched(lines(questions))
+    return gzipped(chunks) if gzip else chunks
+
+def write_snapshot(questions, path):
+    """Write the questions, their subjects and options to a new SQLite file"""
+    database = sqlite3.connect(path)
+    try:
+        database.executescript(SNAPSHOT_SCHEMA)
+        database.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('version', str(SNAPSHOT_VERSION)),
+            ('exported_at', timezone.now().isoformat()),
+        ])
+        database.executemany(
+            'INSERT INTO subjects VALUES (?, ?, ?)',
+            Subject.objects.filter(
+                id__in=questions.values('subject_id')
+            ).values_list('id', 'name', 'description').iterator(chunk_size=CHUNK_SIZE)
+        )
+        # Rows are streamed straight from one query per table
+        database.executemany(
+            'INSERT INTO questions VALUES (?, ?, ?, ?, ?)',
+            questions.order_by('id').values_list(
+                'id', 'subject_id', 'text', 'type', 'points'
+            ).iterator(chunk_size=CHUNK_SIZE)
+        )
+        database.executemany(
+            'INSERT INTO options VALUES (?, ?, ?, ?)',
+            QuestionOption.objects.filter(
+                question__in=questions.values('id')
+            ).order_by('question_id', 'order', 'id').values_list(
+                'question_id', 'order', 'text', 'is_correct'
+            ).iterator(chunk_size=CHUNK_SIZE)
+        )
+        database.commit()
+    finally:
+        database.close()
+
+def snapshot_file(questions):
+    """Write a bank snapshot to an anonymous temporary file and return it open for reading"""
+    descriptor, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(descriptor)
+    try:
+        write_snapshot(questions, path)
+        snapshot = open(path, 'rb')
+    finally:
+        # The open file stays readable after its name is removed
+        os.unlink(path)
+    return snapshot
@@ -0,0 +1,405 @@
+"""
+Bulk import of questions from JSON, NDJSON or CSV files.
+
+The JSON format is the one written by the question bank export: an object
+with a ``questions`` array (a bare array also works) whose items have
+``text``, ``type``, ``subject`` (a name or an id), ``points`` and
+``options``, each option having ``text`` and ``isCorrect`` (or
+``is_correct``). NDJSON files hold one such question per line. CSV files
+have ``text``, ``type`` and ``subject`` columns, an optional ``points``
+column, ``option_1`` ... ``option_N`` columns and a ``correct`` column with
+the 1-based numbers of the correct options, separated by ``;``; a CSV
+subject made of digits only is a subject id, as a JSON number is. Bank
+snapshots written by the export (``sqlite``) are read as well.
+
+Files are parsed incrementally, so a large upload is never held in memory as
+a whole. Questions are validated and inserted in batches: subjects are
+resolved with one query per batch, questions and options are written with
+bulk_create, and every batch commits in its own transaction. Invalid rows are
+skipped and reported with their row number.
+"""
+import codecs
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from django.db import transaction
+from .models import Subject, Question, QuestionOption
+from . import search
+from .export import SNAPSHOT_VERSION
+
+BATCH_SIZE = 1000
+READ_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ('json', 'ndjson', 'csv', 'sqlite')
+
+QUESTION_TYPES = {choice for choice, _ in Question.QUESTION_TYPES}
+OPTION_TEXT_MAX_LENGTH = QuestionOption._meta.get_field('text').max_length
+SUBJECT_NAME_MAX_LENGTH = Subject._meta.get_field('name').max_length
+
+class ImportFileError(Exception):
+    """The file cannot be parsed any further"""
+
+def guess_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('sqlite3', 'db'):
+        return 'sqlite'
+    return extension if extension in FORMATS else 'json'
+
+def _text_chunks(stream):
+    """Decode a binary or text stream into text chunks"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+class _JSONStream:
+    """Incremental reader of JSON values with json.JSONDecoder.raw_decode"""
+
+    def __init__(self, stream):
+        self.chunks = _text_chunks(stream)
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self):
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character, or '' at the end of the file"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return ''
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ImportFileError(f"Invalid JSON: expected '{character}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value, reading more of the file until it is complete"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if not self.eof and self.read_more():
+                    continue
+                raise ImportFileError(f'Invalid JSON: {e.msg}')
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self.read_more():
+                continue
+            self.pos = end
+            return value
+
+def iter_json(stream):
+    """Yield the questions of a JSON export file one at a time"""
+    reader = _JSONStream(stream)
+    if reader.peek() == '{':
+        # Skip ahead to the questions array of an export object
+        reader.expect('{')
+        while True:
+            if reader.peek() == '}':
+                raise ImportFileError("Invalid JSON structure. Expected 'questions' array.")
+            key = reader.value()
+            reader.expect(':')
+            if key == 'questions':
+                break
+            reader.value()
+            if reader.peek() == ',':
+                reader.expect(',')
+
+    reader.expect('[')
+    if reader.peek() == ']':
+        return
+    while True:
+        yield reader.value()
+        if reader.peek() == ']':
+            return
+        reader.expect(',')
+
+def iter_ndjson(stream):
+    """Yield one question per non-empty line"""
+    pending = ''
+    for chunk in _text_chunks(stream):
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield _ndjson_line(line)
+    if pending.strip():
+        yield _ndjson_line(pending)
+
+def _ndjson_line(line):
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return ImportFileError(f'Invalid JSON: {e.msg}')
+
+def iter_csv(stream):
+    """Yield CSV rows as questions in the JSON layout"""
+    for row in csv.DictReader(_csv_lines(stream)):
+        option_columns = sorted(
+            (key for key in row if key and key.startswith('option_') and key[7:].isdigit()),
+            key=lambda key: int(key[7:])
+        )
+        correct = {number.strip() for number in (row.get('correct') or '').replace(',', ';').split(';')}
+        subject = (row.get('subject') or '').strip()
+        yield {
+            'text': row.get('text'),
+            'type': row.get('type'),
+            'subject': int(subject) if subject.isascii() and subject.isdigit() else subject,
+            'points': row.get('points') or 1,
+            'options': [
+                {'text': row[key], 'is_correct': key[7:] in correct}
+                for key in option_columns if row[key]
+            ],
+        }
+
+def _csv_lines(stream):
+    pending = ''
+    for chunk in _text_chunks(stream):
+        lines = (pending + chunk).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        yield from lines
+    if pending:
+        yield pending
+
+def iter_sqlite(stream):
+    """Yield the questions of a bank snapshot"""
+    path = getattr(stream, 'temporary_file_path', None)
+    if path is not None:
+        yield from _snapshot_records(path())
+        return
+
+    # SQLite needs a file on disk
+    descriptor, path = tempfile.mkstemp(suffix='.sqlite')
+    try:
+        with os.fdopen(descriptor, 'wb') as copy:
+            shutil.copyfileobj(stream, copy, READ_SIZE)
+        yield from _snapshot_records(path)
+    finally:
+        os.unlink(path)
+
+def _snapshot_records(path):
+    database = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        try:
+            version = database.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.DatabaseError:
+            version = None
+        if version is None or int(version[0]) > SNAPSHOT_VERSION:
+            raise ImportFileError('Not a question bank snapshot')
+
+        # Options are merged into their questions from a second ordered stream
+        options = database.execute(
+            'SELECT question_id, text, is_correct FROM options ORDER BY question_id, "order"'
+        )
+        pending = options.fetchone()
+        for question_id, text, question_type, points, subject in database.cursor().execute(
+            'SELECT q.id, q.text, q.type, q.points, s.name FROM questions q '
+            'JOIN subjects s ON s.id = q.subject_id ORDER BY q.id'
+        ):
+            question_options = []
+            while pending is not None and pending[0] <= question_id:
+                if pending[0] == question_id:
+                    question_options.append({'text': pending[1], 'is_correct': bool(pending[2])})
+                pending = options.fetchone()
+            yield {
+                'text': text,
+                'type': question_type,
+                'subject': subject,
+                'points': points,
+                'options': question_options,
+            }
+    finally:
+        database.close()
+
+PARSERS = {'json': iter_json, 'ndjson': iter_ndjson, 'csv': iter_csv, 'sqlite': iter_sqlite}
+
+def validate_question(data):
+    """Return (cleaned question, errors) for one imported question"""
+    if not isinstance(data, dict):
+        return None, {'non_field_errors': ['Expected an object']}
+
+    errors = {}
+    text = data.get('text')
+    if not isinstance(text, str) or not text.strip():
+        errors['text'] = ['This field is required.']
+
+    question_type = data.get('type')
+    if question_type not in QUESTION_TYPES:
+        errors['type'] = [f'"{question_type}" is not a valid choice.']
+
+    subject = data.get('subject')
+    if isinstance(subject, str):
+        subject = subject.strip()
+    if subject in (None, '') or isinstance(subject, bool) or not isinstance(subject, (str, int)):
+        errors['subject'] = ['This field is required.']
+    elif isinstance(subject, str) and len(subject) > SUBJECT_NAME_MAX_LENGTH:
+        errors['subject'] = [f'Ensure this field has no more than {SUBJECT_NAME_MAX_LENGTH} characters.']
+
+    try:
+        points = int(data.get('points') or 1)
+        if points < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors['points'] = ['Ensure this value is a whole number greater than or equal to 1.']
+        points = None
+
+    options = []
+    raw_options = data.get('options')
+    if not isinstance(raw_options, list):
+        raw_options = []
+    for order, option in enumerate(raw_options, start=1):
+        if not isinstance(option, dict) or not isinstance(option.get('text'), str) or not option['text']:
+            errors['options'] = ['Every option needs a text']
+            break
+        if len(option['text']) > OPTION_TEXT_MAX_LENGTH:
+            errors['options'] = [f'Option texts can have at most {OPTION_TEXT_MAX_LENGTH} characters']
+            break
+        is_correct = option.get('isCorrect', option.get('is_correct', False))
+        options.append((option['text'], bool(is_correct), option.get('order') or order))
+
+    if 'options' not in errors:
+        correct_count = sum(1 for _, is_correct, _ in options if is_correct)
+        if len(options) < 2:
+            errors['options'] = ['Question must have at least 2 options']
+        elif not correct_count:
+            errors['options'] = ['At least one option must be marked as correct']
+        elif question_type == 'single-choice' and correct_count > 1:
+            errors['options'] = ['Single choice questions can only have one correct answer']
+
+    if errors:
+        return None, errors
+    return {'text': text, 'type': question_type, 'subject': subject, 'points': points, 'options': options}, None
+
+class QuestionImporter:
+    """Validate and insert parsed questions in batches, collecting a per-row report"""
+
+    def __init__(self, author, batch_size=BATCH_SIZE, create_subjects=True):
+        self.author = author
+        self.batch_size = batch_size
+        self.create_subjects = create_subjects
+        self.subjects = {}
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def report_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def resolve_subjects(self, references):
+        """Map subject names and ids to subject ids, with one query for the unknown ones"""
+        unknown = {reference for reference in references if reference not in self.subjects}
+        if not unknown:
+            return
+        names = {reference for reference in unknown if isinstance(reference, str)}
+        ids = {reference for reference in unknown if isinstance(reference, int)}
+        for subject_id, name in Subject.objects.filter(name__in=names).values_list('id', 'name'):
+            self.subjects[name] = subject_id
+        for subject_id in Subject.objects.filter(id__in=ids).values_list('id', flat=True) if ids else ():
+            self.subjects[subject_id] = subject_id
+
+        missing = sorted(name for name in names if name not in self.subjects)
+        if missing and self.create_subjects:
+            Subject.objects.bulk_create([Subject(name=name) for name in missing], ignore_conflicts=True)
+            for subject_id, name in Subject.objects.filter(name__in=missing).values_list('id', 'name'):
+                self.subjects[name] = subject_id
+
+    def import_batch(self, batch):
+        """Validate and insert one batch of (row, question data) pairs"""
+        valid = []
+        for row, data in batch:
+            if isinstance(data, ImportFileError):
+                self.report_error(row, {'non_field_errors': [str(data)]})
+                continue
+            cleaned, errors = validate_question(data)
+            if errors:
+                self.report_error(row, errors)
+            else:
+                valid.append((row, cleaned))
+
+        self.resolve_subjects({cleaned['subject'] for _, cleaned in valid})
+        questions = []
+        options = []
+        for row, cleaned in valid:
+            subject_id = self.subjects.get(cleaned['subject'])
+            if subject_id is None:
+                self.report_error(row, {'subject': [f'Subject "{cleaned["subject"]}" does not exist.']})
+                continue
+            questions.append(Question(
+                text=cleaned['text'],
+                subject_id=subject_id,
+                type=cleaned['type'],
+                points=cleaned['points'],
+                author=self.author
+            ))
+            options.append(cleaned['options'])
+
+        with transaction.atomic():
+            Question.objects.bulk_create(questions)
+            QuestionOption.objects.bulk_create([
+                QuestionOption(question=question, text=text, is_correct=is_correct, order=order)
+                for question, question_options in zip(questions, options)
+                for text, is_correct, order in question_options
+            ])
+            # bulk_create skips the signals that maintain the search index
+            search.index_questions([question.pk for question in questions])
+        self.created += len(questions)
+
+    def run(self, questions):
+        """Import an iterable of parsed questions and return the report"""
+        batch = []
+        row = 0
+        file_error = None
+        try:
+            for row, data in enumerate(questions, start=1):
+                if data is None:
+                    continue
+                batch.append((row, data))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+        except ImportFileError as e:
+            # Rows parsed before the error are still imported
+            file_error = e
+        if batch:
+            self.import_batch(batch)
+        if file_error is not None:
+            self.report_error(row + 1, {'non_field_errors': [str(file_error)]})
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+def import_questions(stream, import_format, author, batch_size=BATCH_SIZE):
+    """Import questions from a file object and return the import report"""
+    importer = QuestionImporter(author, batch_size=batch_size)
+    return importer.run(PARSERS[import_format](stream))
@@ -0,0 +1 @@
+# Management commands for questions app 
\ No newline at end of file
@@ -0,0 +1,37 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from questions import export
+from questions.models import Question
+
+class Command(BaseCommand):
+    help = 'Export the question bank as JSON, NDJSON or a bank snapshot (SQLite) file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write')
+        parser.add_argument('--format', choices=export.FORMATS,
+                            help='File format (default: guessed from the file extension)')
+        parser.add_argument('--subject', type=int, help='Only export questions of this subject id')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        export_format = options['format'] or next(
+            (name for name in export.FORMATS if path.lower().endswith(f'.{name}')), 'json'
+        )
+        questions = Question.objects.all()
+        if options['subject']:
+            questions = questions.filter(subject_id=options['subject'])
+
+        try:
+            if export_format == 'sqlite':
+                # Snapshots are written into a new database, like other formats overwrite their file
+                if os.path.exists(path):
+                    os.remove(path)
+                export.write_snapshot(questions, path)
+            else:
+                with open(path, 'wb') as output:
+                    for chunk in export.export_stream(questions, export_format):
+                        output.write(chunk)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {questions.count()} questions to {path}'))
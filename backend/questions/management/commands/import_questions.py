@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from questions import importer
+
+class Command(BaseCommand):
+    help = 'Import questions from a JSON, NDJSON, CSV or bank snapshot (SQLite) file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--author', required=True,
+                            help='Email of the user the questions are attributed to')
+        parser.add_argument('--format', choices=importer.FORMATS,
+                            help='File format (default: guessed from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=importer.BATCH_SIZE,
+                            help='Questions validated and inserted per transaction')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            author = User.objects.get(email=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['author']}")
+
+        import_format = options['format'] or importer.guess_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.import_questions(stream, import_format, author, options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if report['errors_truncated']:
+            self.stderr.write('More errors were found but not listed')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} questions, {report['failed']} rows failed"
+        ))
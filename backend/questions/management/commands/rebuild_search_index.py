@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from questions import search
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the question bank'
+
+    def handle(self, *args, **options):
+        if search.search_backend() is None:
+            self.stdout.write(self.style.WARNING('This database has no question search index'))
+            return
+
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Question search index rebuilt'))
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:02
+
+from django.db import migrations
+from questions import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor)
+    search.rebuild_index()
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_question_question_created_at_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0003_question_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['subject', 'type', 'points', 'id'], name='question_blueprint_idx'),
+        ),
+    ]
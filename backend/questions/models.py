@@ -36,6 +36,12 @@ class Question(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the question bank
+            models.Index(fields=['-created_at', '-id'], name='question_created_at_idx'),
+            # Blueprint sampling by subject, type and points within id ranges
+            models.Index(fields=['subject', 'type', 'points', 'id'], name='question_blueprint_idx'),
+        ]
 
 class QuestionOption(models.Model):
     """Model for question answer options"""
@@ -0,0 +1,167 @@
+"""
+Full-text search index for the question bank.
+
+Question texts and subject names are indexed in an FTS5 virtual table on
+SQLite and in a tsvector table with a GIN index on PostgreSQL. Both are kept
+in sync by signals (see questions.signals); code that bypasses signals, such
+as bulk_create, should call index_questions() itself. QuestionSearchFilter
+serves the ``search`` query parameter from the index, ranking matches and
+treating every search term as a prefix. Other databases fall back to
+SearchFilter's ``icontains`` lookups.
+"""
+import re
+from django.db import connection
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+SQLITE_TABLE = 'questions_question_fts'
+POSTGRES_TABLE = 'questions_question_search'
+POSTGRES_CONFIG = 'english'
+
+_available = {}
+
+def search_backend():
+    """Return the index backend of the current database, or None"""
+    if connection.vendor not in _available:
+        if connection.vendor == 'sqlite':
+            table = SQLITE_TABLE
+        elif connection.vendor == 'postgresql':
+            table = POSTGRES_TABLE
+        else:
+            table = None
+        available = table is not None and table in connection.introspection.table_names()
+        _available[connection.vendor] = connection.vendor if available else None
+    return _available[connection.vendor]
+
+def create_index(schema_editor):
+    """Create the search index table for the migration's database"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SQLITE_TABLE} USING fts5("
+            "text, subject_name, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE {POSTGRES_TABLE} ("
+            "question_id bigint PRIMARY KEY REFERENCES questions_question (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {POSTGRES_TABLE}_document_idx ON {POSTGRES_TABLE} USING GIN (document)"
+        )
+    _available.clear()
+
+def drop_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {POSTGRES_TABLE}")
+    _available.clear()
+
+def _index_sql(where):
+    backend = search_backend()
+    if backend == 'sqlite':
+        return (
+            f"INSERT OR REPLACE INTO {SQLITE_TABLE} (rowid, text, subject_name) "
+            "SELECT q.id, q.text, s.name FROM questions_question q "
+            f"JOIN questions_subject s ON s.id = q.subject_id {where}"
+        )
+    if backend == 'postgresql':
+        return (
+            f"INSERT INTO {POSTGRES_TABLE} (question_id, document) "
+            f"SELECT q.id, setweight(to_tsvector('{POSTGRES_CONFIG}', q.text), 'A') || "
+            f"setweight(to_tsvector('{POSTGRES_CONFIG}', s.name), 'B') FROM questions_question q "
+            f"JOIN questions_subject s ON s.id = q.subject_id {where} "
+            "ON CONFLICT (question_id) DO UPDATE SET document = EXCLUDED.document"
+        )
+    return None
+
+def _execute_for_ids(sql, ids, batch_size=500):
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            cursor.execute(sql % ', '.join(['%s'] * len(batch)), batch)
+
+def index_questions(question_ids):
+    """Add or refresh the index entries of the given questions"""
+    sql = _index_sql('WHERE q.id IN (%s)')
+    if sql is not None:
+        _execute_for_ids(sql, question_ids)
+
+def index_subject(subject_id):
+    """Refresh the index entries of every question of a subject"""
+    sql = _index_sql('WHERE q.subject_id = %s')
+    if sql is not None:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [subject_id])
+
+def unindex_questions(question_ids):
+    """Remove the index entries of the given questions"""
+    backend = search_backend()
+    if backend == 'sqlite':
+        _execute_for_ids(f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN (%s)", question_ids)
+    elif backend == 'postgresql':
+        _execute_for_ids(f"DELETE FROM {POSTGRES_TABLE} WHERE question_id IN (%s)", question_ids)
+
+def rebuild_index():
+    """Reindex every question from scratch"""
+    backend = search_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        table = SQLITE_TABLE if backend == 'sqlite' else POSTGRES_TABLE
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(_index_sql(''))
+
+def search_terms(query):
+    """Split a search query into plain word tokens"""
+    return re.findall(r'\w+', query.lower())
+
+def search(queryset, query):
+    """Filter a question queryset to index matches, annotated with search_rank"""
+    backend = search_backend()
+    terms = search_terms(query)
+    if backend is not None and not terms:
+        return queryset
+
+    if backend == 'sqlite':
+        # Every term is a quoted prefix; FTS5's rank is bm25(), lower is better
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            select={'search_rank': f'{SQLITE_TABLE}.rank'},
+            tables=[SQLITE_TABLE],
+            where=[f'{SQLITE_TABLE}.rowid = questions_question.id', f'{SQLITE_TABLE} MATCH %s'],
+            params=[match]
+        )
+    if backend == 'postgresql':
+        # Negated so that, as with bm25(), lower ranks are better matches
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.extra(
+            select={'search_rank': f"-ts_rank_cd({POSTGRES_TABLE}.document, to_tsquery('{POSTGRES_CONFIG}', %s))"},
+            select_params=[tsquery],
+            tables=[POSTGRES_TABLE],
+            where=[
+                f'{POSTGRES_TABLE}.question_id = questions_question.id',
+                f"{POSTGRES_TABLE}.document @@ to_tsquery('{POSTGRES_CONFIG}', %s)"
+            ],
+            params=[tsquery]
+        )
+    return None
+
+class QuestionSearchFilter(SearchFilter):
+    """SearchFilter served from the full-text index when the database has one"""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        results = search(queryset, query) if query else None
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+
+        # Best matches first, unless the client asked for another ordering
+        if 'search_rank' in results.query.extra_select and api_settings.ORDERING_PARAM not in request.query_params:
+            results = results.order_by('search_rank', '-id')
+        return results
@@ -11,15 +11,19 @@ class SubjectSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
     
     def get_questions_count(self, obj):
+        # List views annotate the count to avoid one query per subject
+        if hasattr(obj, 'annotated_questions_count'):
+            return obj.annotated_questions_count
         return obj.questions.count()
 
 class QuestionOptionSerializer(serializers.ModelSerializer):
     """Serializer for QuestionOption model"""
+    # Writable so that question updates can refer to existing options
+    id = serializers.IntegerField(required=False)
     
     class Meta:
         model = QuestionOption
         fields = ['id', 'text', 'is_correct', 'order']
-        read_only_fields = ['id']
 
 class QuestionSerializer(serializers.ModelSerializer):
     """Serializer for Question model"""
@@ -38,6 +42,7 @@ class QuestionSerializer(serializers.ModelSerializer):
         question = Question.objects.create(**validated_data)
         
         for option_data in options_data:
+            option_data.pop('id', None)
             QuestionOption.objects.create(question=question, **option_data)
         
         return question
@@ -52,12 +57,29 @@ class QuestionSerializer(serializers.ModelSerializer):
         
         # Update options if provided
         if options_data is not None:
-            # Delete existing options
-            instance.options.all().delete()
+            # Student answers store option ids, so existing options are updated
+            # in place: matched by id first, then by text
+            existing = list(instance.options.all())
+            by_id = {option.id: option for option in existing}
+            by_text = {}
+            for option in existing:
+                by_text.setdefault(option.text, option)
             
-            # Create new options
+            kept_ids = set()
             for option_data in options_data:
-                QuestionOption.objects.create(question=instance, **option_data)
+                option = by_id.get(option_data.pop('id', None))
+                if option is None or option.id in kept_ids:
+                    option = by_text.get(option_data['text'])
+                if option is None or option.id in kept_ids:
+                    option = QuestionOption.objects.create(question=instance, **option_data)
+                else:
+                    for attr, value in option_data.items():
+                        setattr(option, attr, value)
+                    option.save()
+                kept_ids.add(option.id)
+            
+            # Delete options that are no longer present
+            instance.options.exclude(id__in=kept_ids).delete()
         
         return instance
     
@@ -78,6 +100,17 @@ class QuestionSerializer(serializers.ModelSerializer):
         
         return value
 
+class StudentQuestionOptionSerializer(serializers.ModelSerializer):
+    """Serializer for options shown to students (without the correct answer)"""
+    
+    class Meta:
+        model = QuestionOption
+        fields = ['id', 'text', 'order']
+
+class StudentQuestionSerializer(QuestionSerializer):
+    """Serializer for questions shown to students taking an exam"""
+    options = StudentQuestionOptionSerializer(many=True, read_only=True)
+
 class QuestionListSerializer(serializers.ModelSerializer):
     """Simplified serializer for question lists"""
     subject_name = serializers.CharField(source='subject.name', read_only=True)
@@ -91,4 +124,7 @@ class QuestionListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
     
     def get_options_count(self, obj):
+        # List views annotate the count to avoid one query per question
+        if hasattr(obj, 'annotated_options_count'):
+            return obj.annotated_options_count
         return obj.options.count() 
\ No newline at end of file
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Subject, Question
+from . import search
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, **kwargs):
+    """Keep the question's search index entry in sync"""
+    search.index_questions([instance.pk])
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    search.unindex_questions([instance.pk])
+
+@receiver(post_save, sender=Subject)
+def subject_saved(sender, instance, created, **kwargs):
+    """Subject names are indexed with their questions"""
+    if not created:
+        search.index_subject(instance.pk)
@@ -0,0 +1,85 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounts.models import User
+from .models import Subject, Question, QuestionOption
+from .search import index_questions
+
+class QueryBoundTests(TestCase):
+    """Each endpoint runs a fixed number of queries, however many rows it returns"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pw', role='teacher'
+        )
+        subjects = Subject.objects.bulk_create([Subject(name=f'Subject {number}') for number in range(30)])
+        questions = Question.objects.bulk_create([
+            Question(text=f'Question {number}', subject=subjects[number % 30], type='single-choice', author=cls.teacher)
+            for number in range(60)
+        ])
+        QuestionOption.objects.bulk_create([
+            QuestionOption(question=question, text=text, is_correct=text == 'A', order=order)
+            for question in questions
+            for order, text in enumerate('ABCD', start=1)
+        ])
+        index_questions([question.pk for question in questions])
+        cls.subject, cls.question = subjects[0], questions[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_subject_list(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.client.get('/api/questions/subjects/').json()['results']), 20)
+
+    def test_subject_detail(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(f'/api/questions/subjects/{self.subject.pk}/').status_code, 200)
+
+    def test_question_list(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.client.get('/api/questions/').json()['results']), 20)
+
+    def test_question_search(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.client.get('/api/questions/?search=question').json()['results']), 20)
+
+    def test_ranked_search_is_not_cursor_paginated(self):
+        response = self.client.get('/api/questions/?search=question&pagination=cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pagination', response.json())
+
+        response = self.client.get('/api/questions/?search=question&pagination=cursor&ordering=-created_at')
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_question_detail(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/questions/{self.question.pk}/')
+        self.assertEqual(len(response.json()['options']), 4)
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pw', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def import_csv(self, *rows):
+        lines = ['text,type,subject,option_1,option_2,correct', *rows]
+        upload = SimpleUploadedFile('questions.csv', '\n'.join(lines).encode())
+        return self.client.post('/api/questions/import/', {'file': upload}, format='multipart').json()
+
+    def test_subject_ids_and_long_names(self):
+        subject = Subject.objects.create(name='Physics')
+        report = self.import_csv(
+            f'By id,single-choice,{subject.pk},A,B,1',
+            f'Too long,single-choice,{"x" * 101},A,B,1',
+        )
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['row'], 2)
+        self.assertIn('subject', report['errors'][0]['errors'])
+        self.assertEqual(Question.objects.get().subject, subject)
+        self.assertEqual(Subject.objects.count(), 1)
@@ -6,4 +6,6 @@ urlpatterns = [
     path('subjects/<int:pk>/', views.SubjectDetailView.as_view(), name='subject_detail'),
     path('', views.QuestionListCreateView.as_view(), name='question_list_create'),
     path('<int:pk>/', views.QuestionDetailView.as_view(), name='question_detail'),
+    path('export/', views.QuestionExportView.as_view(), name='question_export'),
+    path('import/', views.QuestionImportView.as_view(), name='question_import'),
 ] 
\ No newline at end of file
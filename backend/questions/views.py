@@ -1,14 +1,22 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.db.models import Count
+from django.http import FileResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import Subject, Question
+from .search import QuestionSearchFilter
+from . import importer
+from . import export
 from .serializers import SubjectSerializer, QuestionSerializer, QuestionListSerializer
 from accounts.permissions import IsTeacherOrAdmin
+from exammaster.pagination import OptInCursorPagination
+from exammaster.streaming import accepted_encodings
 
 class SubjectListCreateView(generics.ListCreateAPIView):
     """List all subjects or create a new subject"""
-    queryset = Subject.objects.all()
+    queryset = Subject.objects.annotate(annotated_questions_count=Count('questions'))
     serializer_class = SubjectSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [SearchFilter, OrderingFilter]
@@ -23,7 +31,7 @@ class SubjectListCreateView(generics.ListCreateAPIView):
 
 class SubjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a subject"""
-    queryset = Subject.objects.all()
+    queryset = Subject.objects.annotate(annotated_questions_count=Count('questions'))
     serializer_class = SubjectSerializer
     permission_classes = [IsTeacherOrAdmin]
 
@@ -31,11 +39,19 @@ class QuestionListCreateView(generics.ListCreateAPIView):
     """List all questions or create a new question"""
     queryset = Question.objects.all()
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # The search filter runs last so that it can order results by rank
+    filter_backends = [DjangoFilterBackend, OrderingFilter, QuestionSearchFilter]
     filterset_fields = ['subject', 'type', 'author']
     search_fields = ['text', 'subject__name']
     ordering_fields = ['created_at', 'points', 'subject__name']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    pagination_class = OptInCursorPagination
+    
+    def get_queryset(self):
+        queryset = Question.objects.select_related('subject', 'author')
+        if self.request.method == 'GET':
+            return queryset.annotate(annotated_options_count=Count('options'))
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -58,6 +74,71 @@ class QuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         # Teachers can only modify their own questions, admins can modify all
+        queryset = Question.objects.select_related('subject', 'author').prefetch_related('options')
         if self.request.user.is_admin:
-            return Question.objects.all()
-        return Question.objects.filter(author=self.request.user) 
\ No newline at end of file
+            return queryset
+        return queryset.filter(author=self.request.user)
+
+class QuestionExportView(generics.GenericAPIView):
+    """Stream the question bank as JSON, NDJSON or a SQLite bank snapshot (Teachers/Admins only)"""
+    queryset = Question.objects.all()
+    permission_classes = [IsTeacherOrAdmin]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['subject', 'type', 'author']
+    
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= names the export format, not a renderer; errors are JSON
+        return super().perform_content_negotiation(request, force=True)
+    
+    def get(self, request):
+        export_format = request.query_params.get('format', 'json')
+        if export_format not in export.FORMATS:
+            return Response(
+                {'error': f"format must be one of: {', '.join(export.FORMATS)}"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        questions = self.filter_queryset(self.get_queryset())
+        if export_format == 'sqlite':
+            return FileResponse(
+                export.snapshot_file(questions),
+                as_attachment=True,
+                filename='questions.sqlite',
+                content_type='application/vnd.sqlite3'
+            )
+        
+        use_gzip = 'gzip' in accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        response = StreamingHttpResponse(
+            export.export_stream(questions, export_format, use_gzip),
+            content_type='application/json' if export_format == 'json' else 'application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="questions.{export_format}"'
+        response['Vary'] = 'Accept-Encoding'
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+class QuestionImportView(generics.GenericAPIView):
+    """Import questions from an uploaded JSON, NDJSON, CSV or bank snapshot file (Teachers/Admins only)"""
+    permission_classes = [IsTeacherOrAdmin]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Upload the questions as "file"'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        import_format = request.data.get('format') or importer.guess_format(upload.name)
+        if import_format not in importer.FORMATS:
+            return Response(
+                {'error': f"format must be one of: {', '.join(importer.FORMATS)}"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        report = importer.import_questions(upload, import_format, request.user)
+        if report['created']:
+            return Response(report, status=status.HTTP_201_CREATED)
+        return Response(report, status=status.HTTP_400_BAD_REQUEST)
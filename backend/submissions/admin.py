@@ -1,28 +1,48 @@
 from django.contrib import admin
-from .models import ExamSubmission, StudentAnswer
+from .models import ExamAttempt, ExamStatistics, ExamSubmission, RegradeJob, StudentAnswer
 
 class StudentAnswerInline(admin.TabularInline):
     model = StudentAnswer
     extra = 0
-    readonly_fields = ('question', 'selected_options', 'is_correct', 'points_earned')
+    readonly_fields = ('question', 'selected_option_ids', 'is_correct', 'points_earned')
     can_delete = False
 
 @admin.register(ExamSubmission)
 class ExamSubmissionAdmin(admin.ModelAdmin):
-    list_display = ('student', 'exam', 'submit_time', 'score', 'total_marks', 'percentage', 'is_passed')
-    list_filter = ('is_passed', 'exam', 'submit_time')
+    list_display = ('student', 'exam', 'submit_time', 'status', 'score', 'total_marks', 'percentage', 'is_passed')
+    list_filter = ('status', 'is_passed', 'exam', 'submit_time')
     search_fields = ('student__first_name', 'student__last_name', 'exam__title')
     ordering = ('-submit_time',)
-    readonly_fields = ('start_time', 'score', 'total_marks', 'percentage', 'is_passed')
+    readonly_fields = ('start_time', 'status', 'score', 'total_marks', 'percentage', 'is_passed', 'answers_payload')
+    exclude = ('claim_token', 'claimed_at')
     inlines = [StudentAnswerInline]
 
 @admin.register(StudentAnswer)
 class StudentAnswerAdmin(admin.ModelAdmin):
-    list_display = ('submission', 'question_preview', 'selected_options', 'is_correct', 'points_earned')
+    list_display = ('submission', 'question_preview', 'selected_option_ids', 'is_correct', 'points_earned')
     list_filter = ('is_correct', 'question__type')
     search_fields = ('submission__student__first_name', 'submission__student__last_name', 'question__text')
     readonly_fields = ('is_correct', 'points_earned')
     
     def question_preview(self, obj):
         return obj.question.text[:50] + "..." if len(obj.question.text) > 50 else obj.question.text
-    question_preview.short_description = 'Question' 
\ No newline at end of file
+    question_preview.short_description = 'Question'
+
+@admin.register(ExamAttempt)
+class ExamAttemptAdmin(admin.ModelAdmin):
+    list_display = ('student', 'exam', 'status', 'started_at', 'updated_at')
+    list_filter = ('status', 'exam')
+    search_fields = ('student__first_name', 'student__last_name', 'exam__title')
+    readonly_fields = ('started_at', 'updated_at')
+
+@admin.register(ExamStatistics)
+class ExamStatisticsAdmin(admin.ModelAdmin):
+    list_display = ('exam', 'submissions_count', 'passed_count', 'updated_at')
+    search_fields = ('exam__title',)
+    readonly_fields = [field.name for field in ExamStatistics._meta.fields]
+
+@admin.register(RegradeJob)
+class RegradeJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = [field.name for field in RegradeJob._meta.fields]
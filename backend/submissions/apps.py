@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class SubmissionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'submissions' 
\ No newline at end of file
+    name = 'submissions'
+    
+    def ready(self):
+        from . import checks  # noqa: F401
@@ -0,0 +1,164 @@
+"""
+Autosave for exams in progress.
+
+Every saved answer is its own AttemptAnswer row, and a PATCH upserts the rows
+of the questions it changes in a single statement, so concurrent PATCHes of
+the same attempt never overwrite each other's answers.
+
+With AUTOSAVE['FLUSH_INTERVAL'] set, changes are first merged into a buffer in
+the cache, under a per-attempt cache lock, and written once the oldest
+buffered change is FLUSH_INTERVAL seconds old, so a burst of clicks costs one
+write. Reading or submitting an attempt flushes its buffer first. A PATCH only
+writes a buffer that is already due, so the ``flush_autosaves`` command writes
+the due buffers of attempts that stopped receiving changes (flush_stale); with
+it running, no change stays unsaved for much more than twice FLUSH_INTERVAL.
+The buffer must live in a cache every server process shares, which a system
+check enforces (see submissions.checks).
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import AttemptAnswer, ExamAttempt
+
+# Seconds a buffer lock is held at most, and waited for at most
+LOCK_TIMEOUT = 5
+
+# Buffers fetched from the cache at a time by flush_stale
+SCAN_BATCH_SIZE = 500
+
+def buffering():
+    return settings.AUTOSAVE['FLUSH_INTERVAL'] > 0
+
+def buffer_key(attempt_id):
+    return f'exam_attempt_buffer:{attempt_id}'
+
+@contextmanager
+def buffer_lock(attempt_id):
+    """Hold the attempt's buffer lock, taking it over if its holder died"""
+    key = f'exam_attempt_buffer_lock:{attempt_id}'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(key, token, LOCK_TIMEOUT) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        if cache.get(key) == token:
+            cache.delete(key)
+
+def write(attempt_id, answers, tab_switches=None):
+    """Upsert answers (question id -> selection) and the tab switch count of an attempt"""
+    rows = []
+    for question_id, selected in answers.items():
+        try:
+            rows.append(AttemptAnswer(attempt_id=attempt_id, question_id=int(question_id), selected=selected))
+        except (TypeError, ValueError):
+            # Grading ignores keys that are not question ids
+            continue
+    with transaction.atomic():
+        AttemptAnswer.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['attempt', 'question_id'],
+            update_fields=['selected', 'updated_at']
+        )
+        # Counts only grow, so a delayed request cannot lower it
+        updates = {'updated_at': timezone.now()}
+        if tab_switches is not None:
+            updates['tab_switches'] = Greatest(F('tab_switches'), tab_switches)
+        ExamAttempt.objects.filter(pk=attempt_id).update(**updates)
+
+def record_changes(attempt, answers, tab_switches=None):
+    """
+    Save answer deltas for an attempt, or buffer them if buffering is on.
+
+    Returns True if the changes were written to the database.
+    """
+    if not buffering():
+        write(attempt.pk, answers, tab_switches)
+        return True
+
+    with buffer_lock(attempt.pk):
+        changes = cache.get(buffer_key(attempt.pk)) or {
+            'answers': {},
+            'tab_switches': None,
+            'since': time.time(),
+        }
+        changes['answers'].update(answers)
+        if tab_switches is not None:
+            changes['tab_switches'] = max(tab_switches, changes['tab_switches'] or 0)
+
+        if time.time() - changes['since'] >= settings.AUTOSAVE['FLUSH_INTERVAL']:
+            write(attempt.pk, changes['answers'], changes['tab_switches'])
+            cache.delete(buffer_key(attempt.pk))
+            return True
+
+        cache.set(buffer_key(attempt.pk), changes, settings.AUTOSAVE['BUFFER_TIMEOUT'])
+        return False
+
+def flush_buffer(attempt_id, due_since=None):
+    """
+    Write an attempt's buffered changes, if any.
+
+    With due_since, only a buffer whose oldest change is from due_since or
+    earlier is written.
+    """
+    with buffer_lock(attempt_id):
+        changes = cache.get(buffer_key(attempt_id))
+        if not changes or (due_since is not None and changes['since'] > due_since):
+            return False
+        write(attempt_id, changes['answers'], changes['tab_switches'])
+        cache.delete(buffer_key(attempt_id))
+        return True
+
+def flush(attempt):
+    """Write the attempt's buffered changes, if any"""
+    if not buffering():
+        return False
+    return flush_buffer(attempt.pk)
+
+def flush_stale():
+    """Write the buffers of attempts in progress that are due; returns how many were written"""
+    if not buffering():
+        return 0
+    due_since = time.time() - settings.AUTOSAVE['FLUSH_INTERVAL']
+    attempt_ids = (
+        ExamAttempt.objects.filter(status=ExamAttempt.IN_PROGRESS)
+        .values_list('id', flat=True).iterator(chunk_size=SCAN_BATCH_SIZE)
+    )
+    flushed = 0
+    batch = []
+    for attempt_id in attempt_ids:
+        batch.append(attempt_id)
+        if len(batch) == SCAN_BATCH_SIZE:
+            flushed += _flush_due(batch, due_since)
+            batch = []
+    if batch:
+        flushed += _flush_due(batch, due_since)
+    return flushed
+
+def _flush_due(attempt_ids, due_since):
+    buffers = cache.get_many([buffer_key(attempt_id) for attempt_id in attempt_ids])
+    flushed = 0
+    for attempt_id in attempt_ids:
+        changes = buffers.get(buffer_key(attempt_id))
+        if changes and changes['since'] <= due_since:
+            # Checked again under the lock, since a PATCH may have written it meanwhile
+            flushed += flush_buffer(attempt_id, due_since)
+    return flushed
+
+def current_answers(attempt):
+    """Flush the attempt and return its saved answers and tab switch count"""
+    flush(attempt)
+    answers = {
+        str(question_id): selected
+        for question_id, selected in attempt.saved_answers.values_list('question_id', 'selected')
+    }
+    tab_switches = ExamAttempt.objects.values_list('tab_switches', flat=True).get(pk=attempt.pk)
+    return answers, tab_switches
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.checks import Error, register
+from exammaster.caches import cache_is_shared
+
+@register()
+def autosave_cache_check(app_configs, **kwargs):
+    """Buffered autosave loses answers held in a cache other processes cannot see"""
+    if settings.AUTOSAVE['FLUSH_INTERVAL'] > 0 and not cache_is_shared():
+        return [Error(
+            'AUTOSAVE_FLUSH_INTERVAL buffers answers in the cache, which needs a cache shared by all processes.',
+            hint='Set CACHE_BACKEND to a shared cache such as Redis or Memcached, or AUTOSAVE_FLUSH_INTERVAL to 0.',
+            id='submissions.E001',
+        )]
+    return []
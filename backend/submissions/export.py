@@ -0,0 +1,98 @@
+"""
+Streaming export of submissions and their answers.
+
+Rows are read with values() and iterator(), so only one chunk of rows is in
+memory at a time, and written as CSV or NDJSON lines straight into a
+StreamingHttpResponse, optionally gzip-compressed as they go. When answers
+are included, submissions and answers are read as two streams ordered by
+submission id and merged, which avoids one query per submission.
+"""
+import csv
+import io
+from django.core.serializers.json import DjangoJSONEncoder
+from exammaster.streaming import batched, gzipped
+from .models import StudentAnswer
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+
+SUBMISSION_FIELDS = [
+    'id', 'exam_id', 'exam__title', 'student_id', 'student__email',
+    'student__first_name', 'student__last_name', 'start_time', 'submit_time',
+    'status', 'score', 'total_marks', 'percentage', 'is_passed', 'tab_switches'
+]
+ANSWER_FIELDS = ['question_id', 'selected_option_ids', 'is_correct', 'points_earned']
+
+def submission_rows(submissions):
+    return submissions.order_by('id').values(*SUBMISSION_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+def with_answers(submissions):
+    """Yield (submission, answers) pairs by merging two streams ordered by submission id"""
+    answers = StudentAnswer.objects.filter(
+        submission__in=submissions.values('id')
+    ).order_by('submission_id', 'question_id').values_list(
+        'submission_id', *ANSWER_FIELDS
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    pending = next(answers, None)
+    for submission in submission_rows(submissions):
+        submission_answers = []
+        while pending is not None and pending[0] <= submission['id']:
+            if pending[0] == submission['id']:
+                submission_answers.append(dict(zip(ANSWER_FIELDS, pending[1:])))
+            pending = next(answers, None)
+        yield submission, submission_answers
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ' '.join(str(item) for item in value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def csv_lines(submissions, include_answers=False):
+    """Yield the export as CSV text, one line per submission or per answer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    header = [field.replace('__', '_') for field in SUBMISSION_FIELDS]
+    if not include_answers:
+        writer.writerow(header)
+        yield flush()
+        for submission in submission_rows(submissions):
+            writer.writerow([_csv_value(value) for value in submission.values()])
+            yield flush()
+        return
+
+    writer.writerow(header + ANSWER_FIELDS)
+    yield flush()
+    for submission, answers in with_answers(submissions):
+        values = [_csv_value(value) for value in submission.values()]
+        # Submissions without answers still get a row, with blank answer columns
+        for answer in answers or [dict.fromkeys(ANSWER_FIELDS, '')]:
+            writer.writerow(values + [_csv_value(answer[field]) for field in ANSWER_FIELDS])
+        yield flush()
+
+def ndjson_lines(submissions, include_answers=False):
+    """Yield the export as newline-delimited JSON, one object per submission"""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    if not include_answers:
+        for submission in submission_rows(submissions):
+            yield encoder.encode(submission) + '\n'
+        return
+
+    for submission, answers in with_answers(submissions):
+        submission['answers'] = answers
+        yield encoder.encode(submission) + '\n'
+
+def export_stream(submissions, export_format, include_answers=False, gzip=False):
+    """Return an iterator of byte chunks for an export"""
+    lines = csv_lines if export_format == 'csv' else ndjson_lines
+    chunks = batched(lines(submissions, include_answers))
+    return gzipped(chunks) if gzip else chunks
@@ -0,0 +1,87 @@
+"""
+Set-based grading engine for exam submissions.
+
+The whole answer sheet is graded in memory against the exam's compiled
+answer key (see exams.answer_key), so the cost of a submission does not grow
+with the number of questions in the exam.
+"""
+from django.db import transaction
+from exams.answer_key import get_answer_key
+from .models import ExamSubmission, StudentAnswer
+from .statistics import record_submission
+
+def normalize_answers(answers_data):
+    """Map raw answer payload keys to question ids, dropping keys that are not ids"""
+    normalized = {}
+    for question_id_str, selected_options in answers_data.items():
+        try:
+            question_id = int(question_id_str)
+        except (TypeError, ValueError):
+            continue
+        normalized[question_id] = selected_options if isinstance(selected_options, list) else [selected_options]
+    return normalized
+
+def grade_submission(submission, answers_data, answer_key=None):
+    """
+    Grade an answer payload for a submission that has no answers yet.
+
+    Answers for questions that are not part of the exam are ignored. The
+    submission totals are saved in one conditional update, which also marks
+    the submission as graded; only if the submission still has the status
+    and claim token it was loaded with are its StudentAnswer rows written,
+    with a single bulk insert, and folded into the exam's statistics. A
+    worker whose stale claim was handed to another worker therefore writes
+    nothing, and gets None back.
+    """
+    if answer_key is None:
+        answer_key = get_answer_key(submission.exam)
+
+    answers = []
+    total_score = 0
+    total_possible = 0
+
+    for question_id, selected_options in normalize_answers(answers_data).items():
+        entry = answer_key.get(question_id)
+        if entry is None:
+            continue
+
+        # Selections are stored as option ids, whichever form they arrived in
+        option_ids, is_correct = entry.grade(selected_options)
+        points_earned = entry.points if is_correct else 0
+
+        answers.append(StudentAnswer(
+            submission=submission,
+            question_id=question_id,
+            selected_option_ids=option_ids,
+            is_correct=is_correct,
+            points_earned=points_earned
+        ))
+        total_possible += entry.points
+        total_score += points_earned
+
+    percentage = (total_score / total_possible * 100) if total_possible > 0 else 0
+    totals = {
+        'score': total_score,
+        'total_marks': total_possible,
+        'percentage': percentage,
+        'is_passed': percentage >= submission.exam.pass_percentage,
+    }
+
+    with transaction.atomic():
+        updated = ExamSubmission.objects.filter(
+            pk=submission.pk,
+            status=submission.status,
+            claim_token=submission.claim_token
+        ).update(status=ExamSubmission.GRADED, answers_payload={}, claim_token='', **totals)
+        if not updated:
+            return None
+
+        StudentAnswer.objects.bulk_create(answers)
+        for field, value in totals.items():
+            setattr(submission, field, value)
+        submission.status = ExamSubmission.GRADED
+        submission.answers_payload = {}
+        submission.claim_token = ''
+        record_submission(submission)
+
+    return totals
@@ -0,0 +1,250 @@
+"""
+Item analysis of an exam's graded submissions.
+
+build_response_matrix() streams the exam's answers with a single query into
+dense NumPy arrays: a students x questions matrix of correctness and points
+earned, and a students x options matrix of selections. The arrays are saved
+as .npy files under MEDIA_ROOT/item_analysis and memory-mapped on later
+reads. They are keyed by the exam's statistics revision and content version,
+so any new or regraded submission, or any change to the exam, leads to a
+rebuild.
+
+On top of the matrix, item difficulty, corrected point-biserial
+discrimination, Cronbach's alpha and distractor counts are computed with
+vectorized operations. NumPy is in requirements.txt; on installs without it
+analyze_exam() raises ItemAnalysisUnavailable.
+"""
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from itertools import chain
+from django.conf import settings
+from django.db import connection
+from exams.models import ExamQuestion
+from questions.models import QuestionOption
+from .models import ExamStatistics, ExamSubmission
+from .statistics import rebuild_statistics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Share of students in the upper and lower groups of the distractor analysis
+GROUP_FRACTION = 0.27
+FETCH_SIZE = 5000
+
+CORRECT = 0
+POINTS = 1
+
+ResponseMatrix = namedtuple('ResponseMatrix', ['responses', 'selections', 'submission_ids', 'question_ids', 'option_ids'])
+
+class ItemAnalysisUnavailable(Exception):
+    pass
+
+def cache_dir(exam_id):
+    return os.path.join(settings.MEDIA_ROOT, 'item_analysis', f'exam_{exam_id}')
+
+def revision_key(exam):
+    """Return the cache key of the exam's current graded submissions"""
+    try:
+        statistics = exam.statistics
+    except ExamStatistics.DoesNotExist:
+        statistics = rebuild_statistics(exam.pk)
+    return f'{statistics.revision}-{exam.content_version}'
+
+def _lookup(mapping, keys):
+    """Map keys to integer positions, using -1 for unknown keys"""
+    return np.fromiter((mapping.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+def build_response_matrix(exam):
+    """Build the response and selection matrices of an exam from the database"""
+    question_ids = list(ExamQuestion.objects.filter(exam=exam).order_by('order', 'id').values_list('question_id', flat=True))
+    option_ids = list(QuestionOption.objects.filter(
+        question_id__in=question_ids
+    ).order_by('question_id', 'order', 'id').values_list('id', flat=True))
+
+    # Submissions without answers still get a (blank) row, hence the outer
+    # join. Rows are read straight from the cursor: going through the ORM's
+    # per-row converters costs more than building the whole matrix.
+    answers = ExamSubmission.objects.filter(
+        exam=exam,
+        status=ExamSubmission.GRADED
+    ).order_by('id').values_list(
+        'id', 'answers__question_id', 'answers__is_correct',
+        'answers__points_earned', 'answers__selected_option_ids'
+    )
+    sql, params = answers.query.sql_with_params()
+    submission_column, question_column, correct, points, selected = [], [], [], [], []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            chunk = cursor.fetchmany(FETCH_SIZE)
+            if not chunk:
+                break
+            for column, values in zip((submission_column, question_column, correct, points, selected), zip(*chunk)):
+                column.extend(values)
+
+    submission_ids, rows = np.unique(np.array(submission_column, dtype=np.int64), return_inverse=True)
+    columns = _lookup({question_id: column for column, question_id in enumerate(question_ids)}, question_column)
+    answered = columns >= 0
+
+    responses = np.zeros((2, len(submission_ids), len(question_ids)), dtype=np.float32)
+    responses[CORRECT, rows[answered], columns[answered]] = np.array(
+        [bool(value) for value in correct], dtype=np.float32
+    )[answered]
+    responses[POINTS, rows[answered], columns[answered]] = np.array(
+        [value or 0 for value in points], dtype=np.float32
+    )[answered]
+
+    # Decode every selection with one JSON parse instead of one per answer
+    selections_data = json.loads('[' + ','.join(
+        value if isinstance(value, str) else json.dumps(value) for value in selected
+    ) + ']')
+    counts = np.fromiter((len(value or ()) for value in selections_data), dtype=np.int64, count=len(selections_data))
+    selection_rows = np.repeat(rows, counts)
+    selection_columns = _lookup(
+        {option_id: column for column, option_id in enumerate(option_ids)},
+        list(chain.from_iterable(value or () for value in selections_data))
+    )
+    known = selection_columns >= 0
+
+    selections = np.zeros((len(submission_ids), len(option_ids)), dtype=np.uint8)
+    selections[selection_rows[known], selection_columns[known]] = 1
+    return ResponseMatrix(responses, selections, submission_ids.tolist(), question_ids, option_ids)
+
+def save_response_matrix(matrix, path):
+    """Write a response matrix to a directory, replacing it atomically"""
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent)
+    np.save(os.path.join(staging, 'responses.npy'), matrix.responses)
+    np.save(os.path.join(staging, 'selections.npy'), matrix.selections)
+    with open(os.path.join(staging, 'index.json'), 'w') as index:
+        json.dump({
+            'submission_ids': matrix.submission_ids,
+            'question_ids': matrix.question_ids,
+            'option_ids': matrix.option_ids,
+        }, index)
+    try:
+        os.rename(staging, path)
+    except OSError:
+        # Another worker saved the same revision first
+        shutil.rmtree(staging, ignore_errors=True)
+
+def load_response_matrix(path):
+    """Memory-map a saved response matrix, or return None if there is none"""
+    try:
+        with open(os.path.join(path, 'index.json')) as index:
+            labels = json.load(index)
+        responses = np.load(os.path.join(path, 'responses.npy'), mmap_mode='r')
+        selections = np.load(os.path.join(path, 'selections.npy'), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    return ResponseMatrix(responses, selections, labels['submission_ids'], labels['question_ids'], labels['option_ids'])
+
+def get_response_matrix(exam):
+    """Return the response matrix of the exam's current revision, building it if needed"""
+    if np is None:
+        raise ItemAnalysisUnavailable('Item analysis requires numpy')
+
+    directory = cache_dir(exam.pk)
+    path = os.path.join(directory, revision_key(exam))
+    matrix = load_response_matrix(path)
+    if matrix is None:
+        matrix = build_response_matrix(exam)
+        save_response_matrix(matrix, path)
+
+        # Drop the matrices of older revisions
+        for name in os.listdir(directory):
+            if name != os.path.basename(path) and not name.startswith('tmp'):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return matrix
+
+def _none_if_nan(values):
+    return [None if np.isnan(value) else float(value) for value in values]
+
+def item_statistics(matrix):
+    """Difficulty and corrected point-biserial discrimination of every question"""
+    correct = np.asarray(matrix.responses[CORRECT], dtype=np.float64)
+    points = np.asarray(matrix.responses[POINTS], dtype=np.float64)
+    if not len(correct):
+        empty = [None] * len(matrix.question_ids)
+        return empty, empty
+
+    difficulty = correct.mean(axis=0)
+
+    # Correlate each item with the total score of the other items
+    rest_scores = points.sum(axis=1, keepdims=True) - points
+    correct_centered = correct - difficulty
+    rest_centered = rest_scores - rest_scores.mean(axis=0)
+    numerator = (correct_centered * rest_centered).sum(axis=0)
+    denominator = np.sqrt((correct_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discrimination = np.where(denominator > 0, numerator / denominator, np.nan)
+    return _none_if_nan(difficulty), _none_if_nan(discrimination)
+
+def cronbach_alpha(matrix):
+    """Internal consistency of the exam's item scores"""
+    points = np.asarray(matrix.responses[POINTS], dtype=np.float64)
+    students, items = points.shape
+    if students < 2 or items < 2:
+        return None
+
+    total_variance = points.sum(axis=1).var(ddof=1)
+    if total_variance == 0:
+        return None
+    return float(items / (items - 1) * (1 - points.var(axis=0, ddof=1).sum() / total_variance))
+
+def distractor_counts(matrix):
+    """Selections of every option overall and by the upper and lower scoring groups"""
+    selections = np.asarray(matrix.selections, dtype=np.int64)
+    totals = np.asarray(matrix.responses[POINTS]).sum(axis=1)
+    group_size = int(round(len(totals) * GROUP_FRACTION))
+
+    counts = selections.sum(axis=0)
+    if group_size:
+        ranked = np.argsort(totals, kind='stable')
+        lower = selections[ranked[:group_size]].sum(axis=0)
+        upper = selections[ranked[-group_size:]].sum(axis=0)
+    else:
+        lower = upper = np.zeros_like(counts)
+    return {
+        option_id: (int(counts[column]), int(upper[column]), int(lower[column]))
+        for column, option_id in enumerate(matrix.option_ids)
+    }
+
+def analyze_exam(exam):
+    """Return the item analysis payload of an exam"""
+    matrix = get_response_matrix(exam)
+    difficulty, discrimination = item_statistics(matrix)
+    distractors = distractor_counts(matrix)
+
+    options = {}
+    for option in QuestionOption.objects.filter(question_id__in=matrix.question_ids).order_by('order', 'id'):
+        count, upper_count, lower_count = distractors.get(option.id, (0, 0, 0))
+        options.setdefault(option.question_id, []).append({
+            'option_id': option.id,
+            'text': option.text,
+            'is_correct': option.is_correct,
+            'count': count,
+            'upper_count': upper_count,
+            'lower_count': lower_count,
+        })
+
+    return {
+        'exam_id': exam.id,
+        'submissions_count': len(matrix.submission_ids),
+        'cronbach_alpha': cronbach_alpha(matrix),
+        'questions': [
+            {
+                'question_id': question_id,
+                'difficulty': difficulty[column],
+                'discrimination': discrimination[column],
+                'options': options.get(question_id, []),
+            }
+            for column, question_id in enumerate(matrix.question_ids)
+        ],
+    }
@@ -0,0 +1 @@
+# Management commands for submissions app 
\ No newline at end of file
@@ -0,0 +1,26 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from submissions.autosave import buffering, flush_stale
+
+class Command(BaseCommand):
+    help = 'Write buffered autosaves of exams in progress once they are AUTOSAVE_FLUSH_INTERVAL seconds old'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Flush the due buffers once and exit, e.g. from cron')
+
+    def handle(self, *args, **options):
+        if not buffering():
+            self.stdout.write('Autosave buffering is off (AUTOSAVE_FLUSH_INTERVAL=0), nothing to flush')
+            return
+
+        interval = settings.AUTOSAVE['FLUSH_INTERVAL']
+        while True:
+            flushed = flush_stale()
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} autosave buffers'))
+                return
+            if flushed:
+                self.stdout.write(f'Flushed {flushed} autosave buffers')
+            time.sleep(interval)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from exams.models import Exam
+from submissions.statistics import rebuild_statistics
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized statistics of exams from their graded submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, nargs='+', dest='exam_ids',
+                            help='Only rebuild these exams')
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.all()
+        if options['exam_ids']:
+            exams = exams.filter(pk__in=options['exam_ids'])
+
+        for exam in exams.only('id', 'title').iterator():
+            statistics = rebuild_statistics(exam.pk)
+            self.stdout.write(f'{exam.title}: {statistics.submissions_count} submissions')
+
+        self.stdout.write(self.style.SUCCESS('Exam statistics rebuilt'))
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from submissions.regrade import regrade, run_pending_jobs
+
+class Command(BaseCommand):
+    help = 'Regrade stored answers for the given questions and/or exams'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question', type=int, nargs='+', default=[], dest='question_ids',
+                            help='Ids of questions whose answers should be regraded')
+        parser.add_argument('--exam', type=int, nargs='+', default=[], dest='exam_ids',
+                            help='Ids of exams whose answers should be regraded')
+        parser.add_argument('--chunk-size', type=int, default=settings.REGRADE['CHUNK_SIZE'],
+                            help='Answers regraded per chunk')
+        parser.add_argument('--workers', type=int, default=settings.REGRADE['WORKERS'],
+                            help='Number of worker processes')
+        parser.add_argument('--queued', action='store_true',
+                            help='Run the regrade jobs queued through the API instead')
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            count = run_pending_jobs(chunk_size=options['chunk_size'], workers=options['workers'])
+            self.stdout.write(self.style.SUCCESS(f'Ran {count} queued regrade jobs'))
+            return
+
+        if not options['question_ids'] and not options['exam_ids']:
+            raise CommandError('Provide --question, --exam or --queued')
+
+        self.stdout.write('Regrading answers...')
+        result = regrade(
+            question_ids=options['question_ids'],
+            exam_ids=options['exam_ids'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result['answers_checked']} answers, changed {result['answers_changed']}, "
+            f"refreshed {result['submissions_refreshed']} submissions"
+        ))
@@ -0,0 +1,54 @@
+import multiprocessing
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+def run_worker(batch_size, poll_interval, once):
+    """Entry point of a worker process"""
+    import django
+    django.setup()
+
+    from submissions.queue import process_queue
+    process_queue(batch_size=batch_size, poll_interval=poll_interval, once=once)
+
+class Command(BaseCommand):
+    help = 'Start local workers that grade submissions queued by submit_exam in async mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.GRADING_QUEUE['WORKERS'],
+                            help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=settings.GRADING_QUEUE['BATCH_SIZE'],
+                            help='Submissions claimed by a worker at a time')
+        parser.add_argument('--poll-interval', type=float, default=settings.GRADING_QUEUE['POLL_INTERVAL'],
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue has been drained')
+
+    def handle(self, *args, **options):
+        worker_args = (options['batch_size'], options['poll_interval'], options['once'])
+
+        if options['workers'] <= 1:
+            from submissions.queue import process_queue
+            self.stdout.write('Grading worker started')
+            graded = process_queue(*worker_args)
+            self.stdout.write(self.style.SUCCESS(f'Graded {graded} submissions'))
+            return
+
+        # Worker processes must open their own database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=worker_args, daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {len(workers)} grading workers')
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+
+        self.stdout.write(self.style.SUCCESS('Grading workers stopped'))
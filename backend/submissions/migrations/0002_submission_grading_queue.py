@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examsubmission',
+            name='answers_payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='examsubmission',
+            name='claim_token',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='examsubmission',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Existing submissions were graded synchronously
+        migrations.AddField(
+            model_name='examsubmission',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('grading', 'Grading'), ('graded', 'Graded'), ('failed', 'Failed')], db_index=True, default='graded', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='examsubmission',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('grading', 'Grading'), ('graded', 'Graded'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+    ]
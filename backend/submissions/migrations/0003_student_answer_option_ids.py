@@ -0,0 +1,61 @@
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+def option_texts_to_ids(apps, schema_editor):
+    """Resolve the option texts stored on each answer to option ids"""
+    StudentAnswer = apps.get_model('submissions', 'StudentAnswer')
+    QuestionOption = apps.get_model('questions', 'QuestionOption')
+
+    ids_by_text = {}
+    for option_id, question_id, text in QuestionOption.objects.order_by('order', 'id').values_list('id', 'question_id', 'text'):
+        ids_by_text.setdefault(question_id, {}).setdefault(text, option_id)
+
+    batch = []
+    for answer in StudentAnswer.objects.only('id', 'question_id', 'selected_options').iterator(chunk_size=BATCH_SIZE):
+        texts = ids_by_text.get(answer.question_id, {})
+        # Texts that no longer match an option become 0, which never matches
+        # an answer key, so the answer keeps grading as incorrect
+        answer.selected_option_ids = [texts.get(text, 0) for text in answer.selected_options]
+        batch.append(answer)
+        if len(batch) >= BATCH_SIZE:
+            StudentAnswer.objects.bulk_update(batch, ['selected_option_ids'])
+            batch = []
+    StudentAnswer.objects.bulk_update(batch, ['selected_option_ids'])
+
+def option_ids_to_texts(apps, schema_editor):
+    """Restore option texts from the stored option ids"""
+    StudentAnswer = apps.get_model('submissions', 'StudentAnswer')
+    QuestionOption = apps.get_model('questions', 'QuestionOption')
+
+    texts = dict(QuestionOption.objects.values_list('id', 'text'))
+
+    batch = []
+    for answer in StudentAnswer.objects.only('id', 'selected_option_ids').iterator(chunk_size=BATCH_SIZE):
+        answer.selected_options = [texts[option_id] for option_id in answer.selected_option_ids if option_id in texts]
+        batch.append(answer)
+        if len(batch) >= BATCH_SIZE:
+            StudentAnswer.objects.bulk_update(batch, ['selected_options'])
+            batch = []
+    StudentAnswer.objects.bulk_update(batch, ['selected_options'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+        ('submissions', '0002_submission_grading_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentanswer',
+            name='selected_option_ids',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(option_texts_to_ids, option_ids_to_texts),
+        migrations.RemoveField(
+            model_name='studentanswer',
+            name='selected_options',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0004_exam_attempt'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examsubmission',
+            index=models.Index(fields=['-submit_time', '-id'], name='submission_submit_time_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0004_exam_admission_limits'),
+        ('submissions', '0005_examsubmission_submission_submit_time_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submissions_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('percentage_sum', models.FloatField(default=0.0)),
+                ('percentage_squares_sum', models.FloatField(default=0.0)),
+                ('duration_sum', models.FloatField(default=0.0)),
+                ('percentage_counts', models.JSONField(default=list)),
+                ('duration_counts', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='exams.exam')),
+            ],
+            options={
+                'verbose_name_plural': 'Exam statistics',
+            },
+        ),
+    ]
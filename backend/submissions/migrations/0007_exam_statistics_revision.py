@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0006_exam_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examstatistics',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+def answers_to_rows(apps, schema_editor):
+    """Move the answers stored on each attempt to one row per question"""
+    ExamAttempt = apps.get_model('submissions', 'ExamAttempt')
+    AttemptAnswer = apps.get_model('submissions', 'AttemptAnswer')
+
+    batch = []
+    for attempt in ExamAttempt.objects.only('id', 'answers').iterator(chunk_size=BATCH_SIZE):
+        for question_id, selected in attempt.answers.items():
+            try:
+                batch.append(AttemptAnswer(attempt_id=attempt.id, question_id=int(question_id), selected=selected))
+            except (TypeError, ValueError):
+                continue
+        if len(batch) >= BATCH_SIZE:
+            AttemptAnswer.objects.bulk_create(batch)
+            batch = []
+    AttemptAnswer.objects.bulk_create(batch)
+
+def rows_to_answers(apps, schema_editor):
+    """Restore the answers of each attempt from its rows"""
+    ExamAttempt = apps.get_model('submissions', 'ExamAttempt')
+    AttemptAnswer = apps.get_model('submissions', 'AttemptAnswer')
+
+    answers = {}
+    for attempt_id, question_id, selected in AttemptAnswer.objects.values_list('attempt_id', 'question_id', 'selected').iterator(chunk_size=BATCH_SIZE):
+        answers.setdefault(attempt_id, {})[str(question_id)] = selected
+    batch = []
+    for attempt_id, attempt_answers in answers.items():
+        batch.append(ExamAttempt(id=attempt_id, answers=attempt_answers))
+        if len(batch) >= BATCH_SIZE:
+            ExamAttempt.objects.bulk_update(batch, ['answers'])
+            batch = []
+    ExamAttempt.objects.bulk_update(batch, ['answers'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0007_exam_statistics_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_id', models.BigIntegerField()),
+                ('selected', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_answers', to='submissions.examattempt')),
+            ],
+            options={
+                'unique_together': {('attempt', 'question_id')},
+            },
+        ),
+        migrations.RunPython(answers_to_rows, rows_to_answers),
+        migrations.RemoveField(
+            model_name='examattempt',
+            name='answers',
+        ),
+    ]
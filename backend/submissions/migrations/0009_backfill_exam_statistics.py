@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# The statistics code as of this migration, so later changes to
+# submissions.statistics cannot change what it does
+PERCENTAGE_BUCKETS = 101
+MAX_DURATION_MINUTES = 600
+
+def add_to_counts(counts, bucket):
+    if len(counts) <= bucket:
+        counts.extend([0] * (bucket + 1 - len(counts)))
+    counts[bucket] += 1
+
+def apply_submission(statistics, submission):
+    seconds = max((submission.submit_time - submission.start_time).total_seconds(), 0)
+    statistics.submissions_count += 1
+    statistics.passed_count += int(submission.is_passed)
+    statistics.score_sum += submission.score
+    statistics.percentage_sum += submission.percentage
+    statistics.percentage_squares_sum += submission.percentage ** 2
+    statistics.duration_sum += seconds
+    add_to_counts(statistics.percentage_counts, min(max(int(submission.percentage), 0), PERCENTAGE_BUCKETS - 1))
+    add_to_counts(statistics.duration_counts, min(int(seconds // 60), MAX_DURATION_MINUTES))
+
+def backfill_statistics(apps, schema_editor):
+    """
+    Rebuild the statistics of every exam with graded submissions: rows created
+    by the first submission graded after statistics were added left out the
+    submissions graded before it.
+    """
+    ExamStatistics = apps.get_model('submissions', 'ExamStatistics')
+    ExamSubmission = apps.get_model('submissions', 'ExamSubmission')
+
+    revisions = dict(ExamStatistics.objects.values_list('exam_id', 'revision'))
+    exam_ids = ExamSubmission.objects.filter(status='graded').values_list('exam_id', flat=True).distinct()
+    for exam_id in list(exam_ids):
+        statistics = ExamStatistics(
+            exam_id=exam_id,
+            percentage_counts=[],
+            duration_counts=[],
+            revision=revisions.get(exam_id, 0) + 1
+        )
+        submissions = ExamSubmission.objects.filter(exam_id=exam_id, status='graded').only(
+            'score', 'percentage', 'is_passed', 'start_time', 'submit_time'
+        )
+        for submission in submissions.iterator(chunk_size=2000):
+            apply_submission(statistics, submission)
+        ExamStatistics.objects.update_or_create(exam_id=exam_id, defaults={
+            field.name: getattr(statistics, field.name)
+            for field in ExamStatistics._meta.concrete_fields
+            if field.name not in ('id', 'exam', 'updated_at')
+        })
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0008_attempt_answers'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from exams.models import Exam
 from questions.models import Question
 
@@ -8,9 +9,20 @@ User = get_user_model()
 
 class ExamSubmission(models.Model):
     """Model for exam submissions"""
+    PENDING = 'pending'
+    GRADING = 'grading'
+    GRADED = 'graded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (GRADING, 'Grading'),
+        (GRADED, 'Graded'),
+        (FAILED, 'Failed'),
+    )
+    
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exam_submissions')
-    start_time = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(default=timezone.now)
     submit_time = models.DateTimeField()
     score = models.PositiveIntegerField(default=0)
     total_marks = models.PositiveIntegerField(default=0)
@@ -21,6 +33,12 @@ class ExamSubmission(models.Model):
     is_passed = models.BooleanField(default=False)
     tab_switches = models.PositiveIntegerField(default=0)
     
+    # Asynchronous grading queue
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    answers_payload = models.JSONField(default=dict, blank=True)  # Raw answers waiting to be graded
+    claim_token = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.exam.title}"
     
@@ -50,12 +68,16 @@ class ExamSubmission(models.Model):
     class Meta:
         unique_together = ('exam', 'student')
         ordering = ['-submit_time']
+        indexes = [
+            # Keyset pagination of submission lists
+            models.Index(fields=['-submit_time', '-id'], name='submission_submit_time_idx'),
+        ]
 
 class StudentAnswer(models.Model):
     """Model for individual student answers"""
     submission = models.ForeignKey(ExamSubmission, on_delete=models.CASCADE, related_name='answers')
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
-    selected_options = models.JSONField(default=list)  # Store selected option texts
+    selected_option_ids = models.JSONField(default=list)  # Store selected QuestionOption ids
     is_correct = models.BooleanField(default=False)
     points_earned = models.PositiveIntegerField(default=0)
     
@@ -64,32 +86,102 @@ class StudentAnswer(models.Model):
     
     def check_answer(self):
         """Check if the answer is correct and calculate points"""
-        correct_options = [opt.text for opt in self.question.options.filter(is_correct=True)]
+        from exams.answer_key import get_answer_key
         
-        if self.question.type == 'single-choice':
-            # For single choice, check if the selected option is correct
-            if len(self.selected_options) == 1 and self.selected_options[0] in correct_options:
-                self.is_correct = True
-                self.points_earned = self.question.points
-            else:
-                self.is_correct = False
-                self.points_earned = 0
+        entry = get_answer_key(self.submission.exam).get(self.question_id)
         
-        elif self.question.type == 'multiple-choice':
-            # For multiple choice, all correct options must be selected and no incorrect ones
-            selected_set = set(self.selected_options)
-            correct_set = set(correct_options)
-            
-            if selected_set == correct_set:
-                self.is_correct = True
-                self.points_earned = self.question.points
-            else:
-                self.is_correct = False
-                self.points_earned = 0
+        # Questions that are no longer part of the exam earn nothing
+        self.is_correct = entry is not None and entry.grade(self.selected_option_ids)[1]
+        self.points_earned = entry.points if self.is_correct else 0
         
         self.save()
         return self.is_correct
     
     class Meta:
         unique_together = ('submission', 'question')
-        ordering = ['question__id'] 
\ No newline at end of file
+        ordering = ['question__id']
+
+class ExamAttempt(models.Model):
+    """Model for an exam in progress, autosaved while the student answers"""
+    IN_PROGRESS = 'in_progress'
+    SUBMITTED = 'submitted'
+    STATUS_CHOICES = (
+        (IN_PROGRESS, 'In Progress'),
+        (SUBMITTED, 'Submitted'),
+    )
+    
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='attempts')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exam_attempts')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=IN_PROGRESS)
+    tab_switches = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.student.get_full_name()} - {self.exam.title} ({self.status})"
+    
+    class Meta:
+        unique_together = ('exam', 'student')
+        ordering = ['-started_at']
+
+class AttemptAnswer(models.Model):
+    """Model for the saved answer to one question of an exam in progress"""
+    attempt = models.ForeignKey(ExamAttempt, on_delete=models.CASCADE, related_name='saved_answers')
+    question_id = models.BigIntegerField()  # Not a foreign key: answers are only checked at grading
+    selected = models.JSONField(default=list)  # Selected option ids (or legacy texts)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.attempt} - question {self.question_id}"
+    
+    class Meta:
+        unique_together = ('attempt', 'question_id')
+
+class ExamStatistics(models.Model):
+    """Running statistics of an exam's graded submissions, updated on every submission"""
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name='statistics')
+    submissions_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0.0)
+    percentage_sum = models.FloatField(default=0.0)
+    percentage_squares_sum = models.FloatField(default=0.0)
+    duration_sum = models.FloatField(default=0.0)  # Seconds from start to submission
+    percentage_counts = models.JSONField(default=list)  # Submissions per whole percentage point, 0-100
+    duration_counts = models.JSONField(default=list)  # Submissions per minute taken
+    revision = models.PositiveIntegerField(default=0)  # Bumped whenever the graded submissions change
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Statistics - {self.exam.title}"
+    
+    class Meta:
+        verbose_name_plural = 'Exam statistics'
+
+class RegradeJob(models.Model):
+    """Model for a regrade requested through the API, run by a grading worker"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    
+    question_ids = models.JSONField(default=list)
+    exam_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    result = models.JSONField(default=dict, blank=True)  # Counts returned by regrade()
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='regrade_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Regrade {self.pk} ({self.status})"
+    
+    class Meta:
+        ordering = ['-created_at']
@@ -0,0 +1,113 @@
+"""
+Database-backed grading queue.
+
+In asynchronous mode ``submit_exam`` only stores the raw answer payload on a
+``pending`` submission. Workers started by the ``run_grading_workers``
+management command claim pending submissions in batches and grade them with
+the regular grading engine. Claims are made with a conditional UPDATE, so any
+number of workers can share the queue without a message broker. When no
+submissions are pending, workers run queued regrade jobs (see
+submissions.regrade).
+"""
+import logging
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import OperationalError
+from django.utils import timezone
+from .grading import grade_submission
+from .models import ExamSubmission
+from . import regrade
+
+logger = logging.getLogger(__name__)
+
+def claim_batch(batch_size):
+    """Claim up to batch_size pending submissions, oldest first"""
+    candidate_ids = list(
+        ExamSubmission.objects.filter(status=ExamSubmission.PENDING)
+        .order_by('submit_time', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+
+    # Only rows that are still pending are claimed, so two workers racing
+    # for the same candidates never both get them
+    token = uuid.uuid4().hex
+    ExamSubmission.objects.filter(
+        pk__in=candidate_ids,
+        status=ExamSubmission.PENDING
+    ).update(status=ExamSubmission.GRADING, claim_token=token, claimed_at=timezone.now())
+
+    return list(
+        ExamSubmission.objects.filter(claim_token=token, status=ExamSubmission.GRADING)
+        .select_related('exam')
+    )
+
+def release_stale_claims(timeout=None):
+    """
+    Put submissions claimed by a worker that died back in the queue.
+
+    Clearing the claim token means a worker that was only slow finds its
+    claim gone when it tries to save the grade, and writes nothing.
+    """
+    if timeout is None:
+        timeout = settings.GRADING_QUEUE['CLAIM_TIMEOUT']
+    return ExamSubmission.objects.filter(
+        status=ExamSubmission.GRADING,
+        claimed_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status=ExamSubmission.PENDING, claim_token='')
+
+def grade_batch(submissions):
+    """Grade claimed submissions, each in its own transaction"""
+    graded = 0
+    for submission in submissions:
+        # Updates only apply while the claim is ours, so a worker whose claim
+        # went stale cannot touch a submission another worker now grades
+        claimed = ExamSubmission.objects.filter(
+            pk=submission.pk,
+            status=ExamSubmission.GRADING,
+            claim_token=submission.claim_token
+        )
+        try:
+            if grade_submission(submission, submission.answers_payload) is not None:
+                graded += 1
+            else:
+                logger.warning("Claim on submission %s was released before it was graded", submission.pk)
+        except OperationalError:
+            # Transient database errors (lock timeouts, dropped connections)
+            # put the submission back in the queue for another attempt
+            logger.warning("Requeueing submission %s after a database error", submission.pk, exc_info=True)
+            claimed.update(status=ExamSubmission.PENDING, claim_token='')
+        except Exception:
+            logger.exception("Grading failed for submission %s", submission.pk)
+            claimed.update(status=ExamSubmission.FAILED)
+    return graded
+
+def process_queue(batch_size=None, poll_interval=None, once=False):
+    """
+    Grade pending submissions until stopped.
+
+    With once=True the loop returns as soon as the queue is empty, which is
+    useful for draining the queue from cron or a deploy script.
+    """
+    batch_size = batch_size or settings.GRADING_QUEUE['BATCH_SIZE']
+    poll_interval = poll_interval or settings.GRADING_QUEUE['POLL_INTERVAL']
+    total = 0
+
+    while True:
+        release_stale_claims()
+        submissions = claim_batch(batch_size)
+        if submissions:
+            total += grade_batch(submissions)
+            continue
+        # Regrades only run while no students are waiting for a grade. Workers
+        # may be daemon processes, which cannot start a regrade process pool
+        job = regrade.claim_job()
+        if job is not None:
+            regrade.run_job(job, workers=1)
+            continue
+        if once:
+            return total
+        time.sleep(poll_interval)
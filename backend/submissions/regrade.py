@@ -0,0 +1,179 @@
+"""
+Bulk regrading of stored answers after an answer key changes.
+
+Affected answers are split into id ranges that are regraded independently
+(optionally in a process pool) against the current compiled answer keys and
+written back with bulk_update. Submission totals are then recomputed with
+aggregate UPDATE queries instead of per-submission calculate_score() calls,
+and the statistics of the affected exams are rebuilt.
+
+Regrades requested through the API can take minutes, so they are stored as
+RegradeJob rows and run by the grading workers once no submissions are
+waiting, or by ``manage.py regrade --queued``. Jobs are claimed with a
+conditional UPDATE, like queued submissions.
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from exams.answer_key import get_answer_key
+from exams.models import Exam
+from .models import ExamSubmission, RegradeJob, StudentAnswer
+from .statistics import rebuild_statistics
+
+logger = logging.getLogger(__name__)
+
+def affected_answers(question_ids=None, exam_ids=None):
+    """Return the answers that belong to any of the given questions or exams"""
+    answers = StudentAnswer.objects.none()
+    if question_ids:
+        answers |= StudentAnswer.objects.filter(question_id__in=question_ids)
+    if exam_ids:
+        answers |= StudentAnswer.objects.filter(submission__exam_id__in=exam_ids)
+    return answers
+
+def answer_id_ranges(answers, chunk_size):
+    """Yield (first_id, last_id) ranges covering at most chunk_size answers each"""
+    ids = answers.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        chunk = list(ids.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk[0], chunk[-1]
+        last_id = chunk[-1]
+
+def regrade_chunk(question_ids, exam_ids, first_id, last_id):
+    """Regrade one id range of affected answers, returning how many were checked and changed"""
+    answers = list(
+        affected_answers(question_ids, exam_ids)
+        .filter(id__range=(first_id, last_id))
+        .annotate(exam_id=F('submission__exam_id'))
+        .only('id', 'question_id', 'selected_option_ids', 'is_correct', 'points_earned')
+    )
+    exams = Exam.objects.filter(pk__in={answer.exam_id for answer in answers}).only('id', 'content_version')
+    answer_keys = {exam.pk: get_answer_key(exam) for exam in exams}
+
+    changed = []
+    for answer in answers:
+        entry = answer_keys[answer.exam_id].get(answer.question_id)
+        if entry is None:
+            # The question was removed from the exam; keep the original grade
+            continue
+
+        is_correct = entry.grade(answer.selected_option_ids)[1]
+        points_earned = entry.points if is_correct else 0
+        if is_correct != answer.is_correct or points_earned != answer.points_earned:
+            answer.is_correct = is_correct
+            answer.points_earned = points_earned
+            changed.append(answer)
+
+    with transaction.atomic():
+        StudentAnswer.objects.bulk_update(changed, ['is_correct', 'points_earned'])
+    return len(answers), len(changed)
+
+def refresh_submission_totals(submissions):
+    """Recompute score, total marks, percentage and pass state with aggregate queries"""
+    answers = StudentAnswer.objects.filter(submission=OuterRef('pk')).order_by().values('submission')
+    score = answers.annotate(total=Sum('points_earned')).values('total')
+    total_marks = answers.annotate(total=Sum('question__points')).values('total')
+    pass_percentage = Exam.objects.filter(pk=OuterRef('exam_id')).values('pass_percentage')
+
+    with transaction.atomic():
+        updated = submissions.update(
+            score=Coalesce(Subquery(score), 0),
+            total_marks=Coalesce(Subquery(total_marks), 0)
+        )
+        submissions.update(percentage=Case(
+            When(total_marks__gt=0, then=ExpressionWrapper(
+                Cast('score', FloatField()) / F('total_marks') * 100,
+                output_field=FloatField()
+            )),
+            default=Value(0.0)
+        ))
+        submissions.update(is_passed=Case(
+            When(percentage__gte=Subquery(pass_percentage), then=Value(True)),
+            default=Value(False)
+        ))
+    return updated
+
+def regrade(question_ids=None, exam_ids=None, chunk_size=None, workers=None):
+    """
+    Regrade every answer to the given questions or exams.
+
+    Returns a dict with the number of answers checked and changed and the
+    number of submissions whose totals were refreshed.
+    """
+    chunk_size = chunk_size or settings.REGRADE['CHUNK_SIZE']
+    workers = workers or settings.REGRADE['WORKERS']
+    question_ids = list(question_ids or [])
+    exam_ids = list(exam_ids or [])
+
+    answers = affected_answers(question_ids, exam_ids)
+    tasks = [
+        (question_ids, exam_ids, first_id, last_id)
+        for first_id, last_id in answer_id_ranges(answers, chunk_size)
+    ]
+
+    if workers > 1 and len(tasks) > 1:
+        # Worker processes must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            results = list(pool.map(regrade_chunk, *zip(*tasks)))
+    else:
+        results = [regrade_chunk(*task) for task in tasks]
+
+    submissions = ExamSubmission.objects.filter(
+        pk__in=answers.values('submission_id'),
+        status=ExamSubmission.GRADED
+    )
+    refreshed = refresh_submission_totals(submissions)
+
+    # Scores changed, so the running statistics of these exams are stale
+    for exam_id in submissions.values_list('exam_id', flat=True).distinct().order_by():
+        rebuild_statistics(exam_id)
+
+    return {
+        'answers_checked': sum(checked for checked, _ in results),
+        'answers_changed': sum(changed for _, changed in results),
+        'submissions_refreshed': refreshed,
+    }
+
+def claim_job():
+    """Claim the oldest pending regrade job, or return None"""
+    for job_id in RegradeJob.objects.filter(status=RegradeJob.PENDING).order_by('created_at', 'id').values_list('id', flat=True)[:10]:
+        # Only one worker gets a job off the pending state
+        if RegradeJob.objects.filter(pk=job_id, status=RegradeJob.PENDING).update(
+            status=RegradeJob.RUNNING, started_at=timezone.now()
+        ):
+            return RegradeJob.objects.get(pk=job_id)
+    return None
+
+def run_job(job, chunk_size=None, workers=None):
+    """Run a claimed regrade job and record its result"""
+    try:
+        result = regrade(job.question_ids, job.exam_ids, chunk_size=chunk_size, workers=workers)
+    except Exception as e:
+        logger.exception("Regrade job %s failed", job.pk)
+        RegradeJob.objects.filter(pk=job.pk).update(
+            status=RegradeJob.FAILED, error=str(e), finished_at=timezone.now()
+        )
+        return False
+    RegradeJob.objects.filter(pk=job.pk).update(
+        status=RegradeJob.DONE, result=result, finished_at=timezone.now()
+    )
+    return True
+
+def run_pending_jobs(chunk_size=None, workers=None):
+    """Run queued regrade jobs until none are pending, returning how many ran"""
+    count = 0
+    while True:
+        job = claim_job()
+        if job is None:
+            return count
+        run_job(job, chunk_size=chunk_size, workers=workers)
+        count += 1
@@ -1,17 +1,40 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import ExamSubmission, StudentAnswer
+from .models import ExamAttempt, ExamSubmission, RegradeJob, StudentAnswer
 from questions.serializers import QuestionSerializer
 
+class OptionSelectionField(serializers.Field):
+    """A selected option: its id, or its text for clients using the legacy format"""
+    default_error_messages = {
+        'invalid': 'Expected an option id or option text.',
+    }
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            self.fail('invalid')
+        return data
+    
+    def to_representation(self, value):
+        return value
+
 class StudentAnswerSerializer(serializers.ModelSerializer):
     """Serializer for StudentAnswer model"""
     question = QuestionSerializer(read_only=True)
     question_id = serializers.IntegerField(write_only=True)
+    selected_options = serializers.SerializerMethodField()
     
     class Meta:
         model = StudentAnswer
-        fields = ['id', 'question', 'question_id', 'selected_options', 'is_correct', 'points_earned']
+        fields = [
+            'id', 'question', 'question_id', 'selected_option_ids', 'selected_options',
+            'is_correct', 'points_earned'
+        ]
         read_only_fields = ['id', 'is_correct', 'points_earned']
+    
+    def get_selected_options(self, obj):
+        """Texts of the selected options, for clients that display answers by text"""
+        texts = {option.id: option.text for option in obj.question.options.all()}
+        return [texts[option_id] for option_id in obj.selected_option_ids if option_id in texts]
 
 class ExamSubmissionSerializer(serializers.ModelSerializer):
     """Serializer for ExamSubmission model"""
@@ -23,11 +46,11 @@ class ExamSubmissionSerializer(serializers.ModelSerializer):
         model = ExamSubmission
         fields = [
             'id', 'exam', 'exam_title', 'student', 'student_name', 'start_time', 
-            'submit_time', 'score', 'total_marks', 'percentage', 'is_passed', 
+            'submit_time', 'status', 'score', 'total_marks', 'percentage', 'is_passed', 
             'tab_switches', 'answers'
         ]
         read_only_fields = [
-            'id', 'student', 'start_time', 'score', 'total_marks', 
+            'id', 'student', 'start_time', 'status', 'score', 'total_marks', 
             'percentage', 'is_passed'
         ]
 
@@ -35,8 +58,9 @@ class SubmitExamSerializer(serializers.Serializer):
     """Serializer for exam submission"""
     exam_id = serializers.IntegerField()
     answers = serializers.DictField(
-        child=serializers.ListField(child=serializers.CharField(), allow_empty=True),
-        help_text="Dictionary with question_id as key and list of selected options as value"
+        child=serializers.ListField(child=OptionSelectionField(), allow_empty=True),
+        help_text="Dictionary with question_id as key and list of selected option ids "
+                  "(or, in the legacy format, option texts) as value"
     )
     tab_switches = serializers.IntegerField(default=0)
     
@@ -52,6 +76,49 @@ class SubmitExamSerializer(serializers.Serializer):
         except Exam.DoesNotExist:
             raise serializers.ValidationError("Exam not found or not published")
 
+class StartAttemptSerializer(serializers.Serializer):
+    """Serializer for starting (or resuming) an exam attempt"""
+    exam_id = serializers.IntegerField()
+    
+    def validate_exam_id(self, value):
+        return SubmitExamSerializer().validate_exam_id(value)
+
+class AttemptAnswersSerializer(serializers.Serializer):
+    """Serializer for autosaving answer deltas of an attempt"""
+    answers = serializers.DictField(
+        child=serializers.ListField(child=OptionSelectionField(), allow_empty=True),
+        help_text="Dictionary with question_id as key and the new list of selected options as value"
+    )
+    tab_switches = serializers.IntegerField(required=False, min_value=0)
+
+class ExamAttemptSerializer(serializers.ModelSerializer):
+    """Serializer for ExamAttempt model"""
+    
+    class Meta:
+        model = ExamAttempt
+        fields = ['id', 'exam', 'status', 'tab_switches', 'started_at', 'updated_at']
+        read_only_fields = fields
+
+class RegradeSerializer(serializers.Serializer):
+    """Serializer for bulk regrade requests"""
+    question_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    exam_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    
+    def validate(self, attrs):
+        if not attrs['question_ids'] and not attrs['exam_ids']:
+            raise serializers.ValidationError("Provide question_ids or exam_ids to regrade")
+        return attrs
+
+class RegradeJobSerializer(serializers.ModelSerializer):
+    """Serializer for queued regrade jobs"""
+    class Meta:
+        model = RegradeJob
+        fields = [
+            'id', 'question_ids', 'exam_ids', 'status', 'result', 'error',
+            'requested_by', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
 class ExamResultSerializer(serializers.ModelSerializer):
     """Serializer for exam results"""
     answers = StudentAnswerSerializer(many=True, read_only=True)
@@ -63,7 +130,7 @@ class ExamResultSerializer(serializers.ModelSerializer):
         model = ExamSubmission
         fields = [
             'id', 'exam_title', 'exam_duration', 'exam_pass_percentage',
-            'start_time', 'submit_time', 'score', 'total_marks', 
+            'start_time', 'submit_time', 'status', 'score', 'total_marks', 
             'percentage', 'is_passed', 'tab_switches', 'answers'
         ]
 
@@ -76,5 +143,5 @@ class SubmissionListSerializer(serializers.ModelSerializer):
         model = ExamSubmission
         fields = [
             'id', 'exam_title', 'student_name', 'submit_time', 
-            'score', 'total_marks', 'percentage', 'is_passed'
+            'status', 'score', 'total_marks', 'percentage', 'is_passed'
         ]
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Materialized per-exam statistics.
+
+Every graded submission is folded into the exam's ExamStatistics row as
+running sums and histogram buckets, so reading the statistics costs one
+query however many submissions the exam has. Percentages are bucketed per
+whole point and submission times per minute, and medians are read from the
+buckets, so they are rounded down to a whole point or minute. rebuild_statistics() recomputes
+the row from the submissions themselves, e.g. after a regrade. Both bump the
+row's revision, which derived caches such as item analysis are keyed on.
+"""
+import math
+from django.db import transaction
+from .models import ExamStatistics, ExamSubmission
+
+PERCENTAGE_BUCKETS = 101
+MAX_DURATION_MINUTES = 600
+HISTOGRAM_BINS = 10
+
+def percentage_bucket(percentage):
+    return min(max(int(percentage), 0), PERCENTAGE_BUCKETS - 1)
+
+def duration_seconds(submission):
+    return max((submission.submit_time - submission.start_time).total_seconds(), 0)
+
+def duration_bucket(seconds):
+    return min(int(seconds // 60), MAX_DURATION_MINUTES)
+
+def add_to_counts(counts, bucket):
+    if len(counts) <= bucket:
+        counts.extend([0] * (bucket + 1 - len(counts)))
+    counts[bucket] += 1
+
+def apply_submission(statistics, submission):
+    """Fold a graded submission into the running statistics"""
+    seconds = duration_seconds(submission)
+    statistics.submissions_count += 1
+    statistics.passed_count += int(submission.is_passed)
+    statistics.score_sum += submission.score
+    statistics.percentage_sum += submission.percentage
+    statistics.percentage_squares_sum += submission.percentage ** 2
+    statistics.duration_sum += seconds
+    add_to_counts(statistics.percentage_counts, percentage_bucket(submission.percentage))
+    add_to_counts(statistics.duration_counts, duration_bucket(seconds))
+
+def record_submission(submission):
+    """Add a newly graded submission to its exam's statistics row"""
+    with transaction.atomic():
+        statistics, created = ExamStatistics.objects.select_for_update().get_or_create(exam_id=submission.exam_id)
+        if created:
+            # The exam may have submissions graded before its row existed,
+            # so count them all, this one included
+            return rebuild_statistics(submission.exam_id)
+        apply_submission(statistics, submission)
+        statistics.revision += 1
+        statistics.save()
+    return statistics
+
+def rebuild_statistics(exam_id):
+    """Recompute an exam's statistics row from its graded submissions"""
+    with transaction.atomic():
+        statistics, _ = ExamStatistics.objects.select_for_update().get_or_create(exam_id=exam_id)
+        fresh = ExamStatistics(
+            pk=statistics.pk,
+            exam_id=exam_id,
+            percentage_counts=[],
+            duration_counts=[],
+            revision=statistics.revision + 1
+        )
+        submissions = ExamSubmission.objects.filter(
+            exam_id=exam_id,
+            status=ExamSubmission.GRADED
+        ).only('score', 'percentage', 'is_passed', 'start_time', 'submit_time')
+        for submission in submissions.iterator(chunk_size=2000):
+            apply_submission(fresh, submission)
+        fresh.save()
+    return fresh
+
+def histogram_median(counts, total):
+    """Median of bucketed values, taking every value as its bucket's lower edge"""
+    if not total:
+        return None
+    # Zero-based positions of the middle value, or of the two middle values
+    middle = [(total - 1) // 2, total // 2]
+    values = []
+    seen = 0
+    for bucket, count in enumerate(counts):
+        seen += count
+        while middle and seen > middle[0]:
+            values.append(bucket)
+            middle.pop(0)
+        if not middle:
+            return sum(values) / len(values)
+    return float(len(counts))
+
+def binned(counts, bin_width, total_bins=None):
+    """Merge consecutive buckets into bins of bin_width buckets"""
+    total_bins = total_bins or math.ceil(len(counts) / bin_width)
+    bins = [0] * total_bins
+    for bucket, count in enumerate(counts):
+        bins[min(bucket // bin_width, total_bins - 1)] += count
+    return bins
+
+def summarize(statistics, exam):
+    """Turn a statistics row into the stats endpoint payload"""
+    count = statistics.submissions_count
+    mean = statistics.percentage_sum / count if count else None
+    variance = statistics.percentage_squares_sum / count - mean ** 2 if count else None
+
+    score_bins = binned(statistics.percentage_counts, 10, HISTOGRAM_BINS)
+    score_histogram = [
+        {'range': f'{i * 10}-{i * 10 + 10}', 'count': bin_count}
+        for i, bin_count in enumerate(score_bins)
+    ]
+
+    # Time bins span a tenth of the exam duration each; late submissions
+    # land in the last bin
+    minutes_per_bin = max(math.ceil(exam.duration / HISTOGRAM_BINS), 1)
+    duration_bins = binned(statistics.duration_counts, minutes_per_bin, HISTOGRAM_BINS + 1)
+    time_histogram = [
+        {
+            'minutes': f'{i * minutes_per_bin}-{(i + 1) * minutes_per_bin}' if i < HISTOGRAM_BINS else f'{i * minutes_per_bin}+',
+            'count': bin_count
+        }
+        for i, bin_count in enumerate(duration_bins)
+    ]
+
+    return {
+        'exam_id': exam.id,
+        'submissions_count': count,
+        'passed_count': statistics.passed_count,
+        'pass_rate': statistics.passed_count / count * 100 if count else None,
+        'mean_score': statistics.score_sum / count if count else None,
+        'mean_percentage': mean,
+        'median_percentage': histogram_median(statistics.percentage_counts, count),
+        'std_percentage': math.sqrt(max(variance, 0)) if count else None,
+        'score_histogram': score_histogram,
+        'time_to_submit': {
+            'mean_seconds': statistics.duration_sum / count if count else None,
+            'median_minutes': histogram_median(statistics.duration_counts, count),
+            'histogram': time_histogram,
+        },
+        'updated_at': statistics.updated_at,
+    }
@@ -0,0 +1,256 @@
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from exams.models import Exam
+from questions.models import Subject, Question, QuestionOption
+from .autosave import buffer_key, flush_stale
+from .models import AttemptAnswer, ExamAttempt, ExamStatistics, ExamSubmission, RegradeJob
+from .item_analysis import ResponseMatrix, cronbach_alpha, distractor_counts, item_statistics, np
+from .statistics import histogram_median
+from .queue import claim_batch, grade_batch, process_queue, release_stale_claims
+
+SHARED_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'exammaster-test-cache'),
+}}
+
+def create_exam(teacher, question_count, title='Exam'):
+    """Create a published, open exam whose questions have options A (correct), B and C"""
+    now = timezone.now()
+    exam = Exam.objects.create(
+        title=title, duration=30, is_published=True, created_by=teacher,
+        start_time=now - timedelta(minutes=5), end_time=now + timedelta(days=1)
+    )
+    subject, _ = Subject.objects.get_or_create(name='Mathematics')
+    questions = Question.objects.bulk_create([
+        Question(text=f'Question {number}', subject=subject, type='single-choice', points=1, author=teacher)
+        for number in range(question_count)
+    ])
+    QuestionOption.objects.bulk_create([
+        QuestionOption(question=question, text=text, is_correct=text == 'A', order=order)
+        for question in questions
+        for order, text in enumerate('ABC', start=1)
+    ])
+    exam.set_questions([question.pk for question in questions])
+    exam.calculate_total_marks()
+    return exam, questions
+
+class SubmissionTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pw', role='teacher'
+        )
+        cls.students = [
+            User.objects.create_user(
+                username=f'student{number}', email=f'student{number}@example.com', password='pw', role='student'
+            )
+            for number in range(3)
+        ]
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def correct_answers(self, questions):
+        return {
+            str(question.pk): [question.options.get(text='A').pk]
+            for question in questions
+        }
+
+class AutosaveTests(SubmissionTestCase):
+    def setUp(self):
+        self.exam, self.questions = create_exam(self.teacher, 3)
+        self.client = self.client_for(self.students[0])
+        response = self.client.post('/api/submissions/attempt/start/', {'exam_id': self.exam.pk}, format='json')
+        self.attempt_id = response.json()['id']
+
+    def save(self, answers, **extra):
+        return self.client.patch(
+            f'/api/submissions/attempt/{self.attempt_id}/answers/', {'answers': answers, **extra}, format='json'
+        )
+
+    def test_deltas_of_separate_requests_are_all_kept(self):
+        first, second, _ = self.questions
+        self.save({str(first.pk): [1]}, tab_switches=2)
+        self.save({str(second.pk): [2]}, tab_switches=1)
+        self.save({str(first.pk): [3]})
+
+        saved = dict(AttemptAnswer.objects.filter(attempt_id=self.attempt_id).values_list('question_id', 'selected'))
+        self.assertEqual(saved, {first.pk: [3], second.pk: [2]})
+        # A late request with a lower count does not lower it
+        self.assertEqual(ExamAttempt.objects.get(pk=self.attempt_id).tab_switches, 2)
+
+    def test_resume_returns_saved_answers(self):
+        self.save({str(self.questions[0].pk): [7]})
+        response = self.client.post('/api/submissions/attempt/start/', {'exam_id': self.exam.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['answers'], {str(self.questions[0].pk): [7]})
+
+    @override_settings(AUTOSAVE={'FLUSH_INTERVAL': 60, 'BUFFER_TIMEOUT': 600}, CACHES=SHARED_CACHE)
+    def test_submit_includes_buffered_answers(self):
+        response = self.save(self.correct_answers(self.questions))
+        self.assertFalse(response.json()['saved'])
+        self.assertFalse(AttemptAnswer.objects.exists())
+
+        response = self.client.post(f'/api/submissions/attempt/{self.attempt_id}/submit/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['score'], 3)
+
+    @override_settings(AUTOSAVE={'FLUSH_INTERVAL': 60, 'BUFFER_TIMEOUT': 600}, CACHES=SHARED_CACHE)
+    def test_last_buffered_answers_are_flushed_once_due(self):
+        cache.clear()
+        first, second, _ = self.questions
+        with mock.patch('submissions.autosave.time.time', return_value=1_000_000.0):
+            self.save({str(first.pk): [1]})
+            self.save({str(second.pk): [2]}, tab_switches=1)
+        with mock.patch('submissions.autosave.time.time', return_value=1_000_059.0):
+            self.assertEqual(flush_stale(), 0)
+        self.assertFalse(AttemptAnswer.objects.exists())
+
+        # No further PATCH arrives, yet the answers reach the database
+        with mock.patch('submissions.autosave.time.time', return_value=1_000_060.0):
+            self.assertEqual(flush_stale(), 1)
+        saved = dict(AttemptAnswer.objects.filter(attempt_id=self.attempt_id).values_list('question_id', 'selected'))
+        self.assertEqual(saved, {first.pk: [1], second.pk: [2]})
+        self.assertEqual(ExamAttempt.objects.get(pk=self.attempt_id).tab_switches, 1)
+        self.assertIsNone(cache.get(buffer_key(self.attempt_id)))
+
+    @override_settings(AUTOSAVE={'FLUSH_INTERVAL': 60, 'BUFFER_TIMEOUT': 600})
+    def test_buffering_requires_a_shared_cache(self):
+        errors = [error.id for error in run_checks()]
+        self.assertIn('submissions.E001', errors)
+
+class StatisticsTests(SubmissionTestCase):
+    def submit(self, student, exam, questions):
+        return self.client_for(student).post(
+            '/api/submissions/submit/',
+            {'exam_id': exam.pk, 'answers': self.correct_answers(questions)},
+            format='json'
+        )
+
+    def test_first_recorded_submission_counts_earlier_ones(self):
+        exam, questions = create_exam(self.teacher, 2)
+        self.submit(self.students[0], exam, questions)
+        # As for exams graded before statistics were kept
+        ExamStatistics.objects.filter(exam=exam).delete()
+
+        self.submit(self.students[1], exam, questions)
+        self.assertEqual(ExamStatistics.objects.get(exam=exam).submissions_count, 2)
+
+    def test_median_is_a_possible_percentage(self):
+        exam, questions = create_exam(self.teacher, 2)
+        self.submit(self.students[0], exam, questions)
+        stats = self.client_for(self.teacher).get(f'/api/exams/{exam.pk}/stats/').json()
+        self.assertEqual(stats['median_percentage'], 100)
+
+    def test_median_of_an_even_count_is_the_mean_of_the_middle_values(self):
+        self.assertEqual(histogram_median([0, 1, 0, 2, 1], 4), 3)
+        self.assertEqual(histogram_median([1, 0, 0, 1], 2), 1.5)
+        self.assertEqual(histogram_median([0, 0, 3], 3), 2)
+
+@override_settings(SUBMISSION_GRADING_MODE='async')
+class GradingQueueTests(SubmissionTestCase):
+    def test_released_claim_is_not_graded_twice(self):
+        exam, questions = create_exam(self.teacher, 2)
+        self.client_for(self.students[0]).post(
+            '/api/submissions/submit/',
+            {'exam_id': exam.pk, 'answers': self.correct_answers(questions)},
+            format='json'
+        )
+        [stale] = claim_batch(10)
+        release_stale_claims(timeout=-1)
+        [current] = claim_batch(10)
+
+        self.assertEqual(grade_batch([stale]), 0)
+        self.assertEqual(ExamSubmission.objects.get().status, ExamSubmission.GRADING)
+        self.assertEqual(grade_batch([current]), 1)
+
+        submission = ExamSubmission.objects.get()
+        self.assertEqual((submission.status, submission.score), (ExamSubmission.GRADED, 2))
+        self.assertEqual(submission.answers.count(), 2)
+        self.assertEqual(ExamStatistics.objects.get(exam=exam).submissions_count, 1)
+
+class GradingQueryTests(SubmissionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def submit(self, question_count):
+        exam, questions = create_exam(self.teacher, question_count, title=f'{question_count} questions')
+        answers = self.correct_answers(questions)
+        client = self.client_for(self.students[0])
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post('/api/submissions/submit/', {'exam_id': exam.pk, 'answers': answers}, format='json')
+        self.assertEqual(response.json()['score'], question_count)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_questions(self):
+        self.assertEqual(self.submit(5), self.submit(100))
+
+class RegradeTests(SubmissionTestCase):
+    def test_regrade_is_queued_and_run_by_the_worker(self):
+        exam, questions = create_exam(self.teacher, 2)
+        self.client_for(self.students[0]).post(
+            '/api/submissions/submit/',
+            {'exam_id': exam.pk, 'answers': self.correct_answers(questions)},
+            format='json'
+        )
+        # The key changes: B is the correct option now
+        QuestionOption.objects.update(is_correct=Q(text='B'))
+        Exam.bump_content_version(pk=exam.pk)
+
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        client = self.client_for(admin)
+        response = client.post('/api/submissions/regrade/', {'exam_ids': [exam.pk]}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(ExamSubmission.objects.get().score, 2)
+
+        process_queue(once=True)
+        job = client.get(f"/api/submissions/regrade/{response.json()['id']}/").json()
+        self.assertEqual((job['status'], job['result']['answers_changed']), (RegradeJob.DONE, 2))
+        self.assertEqual(ExamSubmission.objects.get().score, 0)
+
+@unittest.skipIf(np is None, 'Item analysis requires numpy')
+class ItemAnalysisTests(TestCase):
+    def setUp(self):
+        # Four students, three one-point questions with options A (correct) and B
+        correct = [[1, 1, 1], [1, 1, 0], [1, 0, 0], [0, 0, 0]]
+        self.matrix = ResponseMatrix(
+            responses=np.array([correct, correct], dtype=np.float32),
+            selections=np.array([
+                [answer if column % 2 == 0 else 1 - answer for answer in row for column in range(2)]
+                for row in correct
+            ], dtype=np.uint8),
+            submission_ids=[1, 2, 3, 4],
+            question_ids=[10, 20, 30],
+            option_ids=[11, 12, 21, 22, 31, 32]
+        )
+
+    def test_difficulty_and_discrimination(self):
+        difficulty, discrimination = item_statistics(self.matrix)
+        self.assertEqual(difficulty, [0.75, 0.5, 0.25])
+        for value, expected in zip(discrimination, [0.75 / (0.75 * 2.75) ** 0.5, 0.5 ** 0.5, 0.75 / (0.75 * 2.75) ** 0.5]):
+            self.assertAlmostEqual(value, expected)
+
+    def test_alpha_is_kr20_for_right_or_wrong_items(self):
+        # k / (k - 1) * (1 - sum of item variances / total variance) = 1.5 * (1 - (5 / 6) / (5 / 3))
+        self.assertAlmostEqual(cronbach_alpha(self.matrix), 0.75)
+
+    def test_distractor_counts(self):
+        self.assertEqual(distractor_counts(self.matrix), {
+            11: (3, 1, 0), 12: (1, 0, 1),
+            21: (2, 1, 0), 22: (2, 0, 1),
+            31: (1, 1, 0), 32: (3, 0, 1),
+        })
@@ -5,9 +5,16 @@ urlpatterns = [
     # Submission management (Teachers/Admins)
     path('', views.SubmissionListView.as_view(), name='submission_list'),
     path('<int:pk>/', views.SubmissionDetailView.as_view(), name='submission_detail'),
+    path('export/', views.SubmissionExportView.as_view(), name='submission_export'),
     
     # Student submission and results
     path('submit/', views.submit_exam, name='submit_exam'),
+    path('attempt/start/', views.start_attempt, name='start_attempt'),
+    path('attempt/<int:pk>/answers/', views.save_attempt_answers, name='save_attempt_answers'),
+    path('attempt/<int:pk>/submit/', views.submit_attempt, name='submit_attempt'),
+    path('regrade/', views.regrade_submissions, name='regrade_submissions'),
+    path('regrade/<int:pk>/', views.regrade_job_status, name='regrade_job_status'),
     path('my-results/', views.student_results, name='student_results'),
     path('result/<int:pk>/', views.submission_result, name='submission_result'),
+    path('result/<int:pk>/status/', views.submission_status, name='submission_status'),
 ] 
\ No newline at end of file
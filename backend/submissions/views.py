@@ -1,20 +1,33 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import ExamSubmission, StudentAnswer
+from .models import ExamAttempt, ExamStatistics, ExamSubmission, RegradeJob
 from .serializers import (
     ExamSubmissionSerializer,
     SubmitExamSerializer,
     ExamResultSerializer,
-    SubmissionListSerializer
+    SubmissionListSerializer,
+    RegradeSerializer,
+    RegradeJobSerializer,
+    StartAttemptSerializer,
+    AttemptAnswersSerializer,
+    ExamAttemptSerializer
 )
-from accounts.permissions import IsStudentUser, IsTeacherOrAdmin
+from . import autosave
+from .grading import grade_submission
+from .statistics import rebuild_statistics, summarize
+from .item_analysis import ItemAnalysisUnavailable, analyze_exam
+from . import export
+from accounts.permissions import IsAdminUser, IsStudentUser, IsTeacherOrAdmin
 from exams.models import Exam
-from questions.models import Question
+from exammaster.streaming import accepted_encodings
+from exammaster.pagination import OptInCursorPagination
 
 class SubmissionListView(generics.ListAPIView):
     """List all submissions (Teachers/Admins only)"""
@@ -25,7 +38,8 @@ class SubmissionListView(generics.ListAPIView):
     filterset_fields = ['exam', 'student', 'is_passed']
     search_fields = ['student__first_name', 'student__last_name', 'exam__title']
     ordering_fields = ['submit_time', 'score', 'percentage']
-    ordering = ['-submit_time']
+    ordering = ['-submit_time', '-id']
+    pagination_class = OptInCursorPagination
     
     def get_queryset(self):
         # Teachers can only see submissions for their exams, admins can see all
@@ -41,12 +55,53 @@ class SubmissionDetailView(generics.RetrieveAPIView):
     
     def get_queryset(self):
         user = self.request.user
+        queryset = ExamSubmission.objects.prefetch_related('answers__question__options')
         if user.is_admin:
-            return ExamSubmission.objects.all()
+            return queryset
         elif user.is_teacher:
-            return ExamSubmission.objects.filter(exam__created_by=user)
+            return queryset.filter(exam__created_by=user)
         else:  # student
-            return ExamSubmission.objects.filter(student=user)
+            return queryset.filter(student=user)
+
+class SubmissionExportView(generics.GenericAPIView):
+    """Stream submissions, and optionally their answers, as CSV or NDJSON (Teachers/Admins only)"""
+    permission_classes = [IsTeacherOrAdmin]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['exam', 'status', 'is_passed']
+    
+    def get_queryset(self):
+        # Teachers can only export submissions for their exams, admins can export all
+        if self.request.user.is_admin:
+            return ExamSubmission.objects.all()
+        return ExamSubmission.objects.filter(exam__created_by=self.request.user)
+    
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= names the export format, not a renderer; errors are JSON
+        return super().perform_content_negotiation(request, force=True)
+    
+    def get(self, request):
+        export_format = request.query_params.get('format', 'csv')
+        if export_format not in export.FORMATS:
+            return Response(
+                {'error': f"format must be one of: {', '.join(export.FORMATS)}"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        include_answers = request.query_params.get('answers', '').lower() in ('1', 'true', 'yes')
+        use_gzip = 'gzip' in accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        submissions = self.filter_queryset(self.get_queryset())
+        
+        response = StreamingHttpResponse(
+            export.export_stream(submissions, export_format, include_answers, use_gzip),
+            content_type='text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        )
+        exam_id = request.query_params.get('exam')
+        filename = f"submissions{f'-exam-{exam_id}' if exam_id else ''}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Vary'] = 'Accept-Encoding'
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        return response
 
 @api_view(['POST'])
 @permission_classes([IsStudentUser])
@@ -65,6 +120,10 @@ def submit_exam(request):
     except Exam.DoesNotExist:
         return Response({'error': 'Exam not found'}, status=status.HTTP_404_NOT_FOUND)
     
+    return submit_answers(request, exam, answers_data, tab_switches)
+
+def submit_answers(request, exam, answers_data, tab_switches, start_time=None):
+    """Create the current student's submission for an exam and grade or queue it"""
     # Check if student has already submitted this exam
     existing_submission = ExamSubmission.objects.filter(
         exam=exam, 
@@ -85,43 +144,41 @@ def submit_exam(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    if settings.SUBMISSION_GRADING_MODE == 'async':
+        # Queue the raw answers; a grading worker picks them up
+        submission = ExamSubmission.objects.create(
+            exam=exam,
+            student=request.user,
+            start_time=start_time or now,
+            submit_time=now,
+            tab_switches=tab_switches,
+            answers_payload=answers_data
+        )
+        close_attempt(exam, request.user)
+        
+        return Response({
+            'submission_id': submission.id,
+            'status': submission.status,
+            'message': 'Exam submitted successfully, grading in progress'
+        }, status=status.HTTP_202_ACCEPTED)
+    
     with transaction.atomic():
         # Create submission
         submission = ExamSubmission.objects.create(
             exam=exam,
             student=request.user,
+            start_time=start_time or now,
             submit_time=now,
             tab_switches=tab_switches
         )
         
-        # Process answers
-        for question_id_str, selected_options in answers_data.items():
-            try:
-                question_id = int(question_id_str)
-                question = Question.objects.get(id=question_id)
-                
-                # Ensure question is part of the exam
-                if not exam.questions.filter(id=question_id).exists():
-                    continue
-                
-                # Create student answer
-                answer = StudentAnswer.objects.create(
-                    submission=submission,
-                    question=question,
-                    selected_options=selected_options if isinstance(selected_options, list) else [selected_options]
-                )
-                
-                # Check if answer is correct
-                answer.check_answer()
-                
-            except (ValueError, Question.DoesNotExist):
-                continue
-        
-        # Calculate final score
-        result = submission.calculate_score()
+        # Grade the whole answer sheet in one pass
+        result = grade_submission(submission, answers_data)
+        close_attempt(exam, request.user)
         
         return Response({
             'submission_id': submission.id,
+            'status': submission.status,
             'score': result['score'],
             'total_marks': result['total_marks'],
             'percentage': result['percentage'],
@@ -129,6 +186,92 @@ def submit_exam(request):
             'message': 'Exam submitted successfully'
         }, status=status.HTTP_201_CREATED)
 
+def close_attempt(exam, student):
+    """Stop autosaving the student's attempt once the exam is submitted"""
+    ExamAttempt.objects.filter(exam=exam, student=student).update(status=ExamAttempt.SUBMITTED)
+
+@api_view(['POST'])
+@permission_classes([IsStudentUser])
+def start_attempt(request):
+    """Start an exam attempt, or resume the current one with its saved answers"""
+    serializer = StartAttemptSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    attempt, created = ExamAttempt.objects.get_or_create(
+        exam_id=serializer.validated_data['exam_id'],
+        student=request.user
+    )
+    if attempt.status != ExamAttempt.IN_PROGRESS:
+        return Response(
+            {'error': 'You have already submitted this exam'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    data = ExamAttemptSerializer(attempt).data
+    data['answers'], data['tab_switches'] = autosave.current_answers(attempt)
+    return Response(data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+def get_open_attempt(request, pk):
+    """Return the current student's in-progress attempt, or an error Response"""
+    try:
+        attempt = ExamAttempt.objects.select_related('exam').get(pk=pk, student=request.user)
+    except ExamAttempt.DoesNotExist:
+        return None, Response(
+            {'error': 'Attempt not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if attempt.status != ExamAttempt.IN_PROGRESS:
+        return None, Response(
+            {'error': 'You have already submitted this exam'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not attempt.exam.is_published or timezone.now() > attempt.exam.end_time:
+        return None, Response(
+            {'error': 'Exam is no longer available'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return attempt, None
+
+@api_view(['PATCH'])
+@permission_classes([IsStudentUser])
+def save_attempt_answers(request, pk):
+    """Autosave answer deltas for an exam in progress"""
+    attempt, error = get_open_attempt(request, pk)
+    if error:
+        return error
+    
+    serializer = AttemptAnswersSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    saved = autosave.record_changes(
+        attempt,
+        serializer.validated_data['answers'],
+        serializer.validated_data.get('tab_switches')
+    )
+    return Response({'attempt_id': attempt.id, 'saved': saved})
+
+@api_view(['POST'])
+@permission_classes([IsStudentUser])
+def submit_attempt(request, pk):
+    """Submit an exam attempt, grading the answers saved so far"""
+    attempt, error = get_open_attempt(request, pk)
+    if error:
+        return error
+    
+    answers, tab_switches = autosave.current_answers(attempt)
+    return submit_answers(
+        request,
+        attempt.exam,
+        answers,
+        tab_switches,
+        start_time=attempt.started_at
+    )
+
 @api_view(['GET'])
 @permission_classes([IsStudentUser])
 def student_results(request):
@@ -142,7 +285,7 @@ def student_results(request):
 def submission_result(request, pk):
     """Get detailed result for a specific submission"""
     try:
-        submission = ExamSubmission.objects.get(pk=pk)
+        submission = ExamSubmission.objects.prefetch_related('answers__question__options').get(pk=pk)
         
         # Check permissions
         if request.user.is_student and submission.student != request.user:
@@ -163,4 +306,125 @@ def submission_result(request, pk):
         return Response(
             {'error': 'Submission not found'}, 
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def submission_status(request, pk):
+    """Get the grading status of a submission, for polling after an async submit"""
+    try:
+        submission = ExamSubmission.objects.select_related('exam').get(pk=pk)
+        
+        # Check permissions
+        if request.user.is_student and submission.student_id != request.user.id:
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        elif request.user.is_teacher and submission.exam.created_by_id != request.user.id:
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        data = {
+            'submission_id': submission.id,
+            'status': submission.status,
+        }
+        if submission.status == ExamSubmission.GRADED:
+            data.update({
+                'score': submission.score,
+                'total_marks': submission.total_marks,
+                'percentage': submission.percentage,
+                'is_passed': submission.is_passed,
+            })
+        return Response(data)
+        
+    except ExamSubmission.DoesNotExist:
+        return Response(
+            {'error': 'Submission not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def regrade_submissions(request):
+    """Queue a regrade of stored answers after questions or exams were corrected (Admin only)"""
+    serializer = RegradeSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Regrades can take minutes; a grading worker or `regrade --queued` runs it
+    job = RegradeJob.objects.create(
+        question_ids=serializer.validated_data['question_ids'],
+        exam_ids=serializer.validated_data['exam_ids'],
+        requested_by=request.user
+    )
+    return Response(RegradeJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def regrade_job_status(request, pk):
+    """Poll the status and result of a queued regrade (Admin only)"""
+    try:
+        job = RegradeJob.objects.get(pk=pk)
+    except RegradeJob.DoesNotExist:
+        return Response(
+            {'error': 'Regrade job not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(RegradeJobSerializer(job).data)
+
+@api_view(['GET'])
+@permission_classes([IsTeacherOrAdmin])
+def exam_statistics(request, pk):
+    """Get the score and timing statistics of an exam's graded submissions"""
+    try:
+        exam = Exam.objects.get(pk=pk)
+    except Exam.DoesNotExist:
+        return Response(
+            {'error': 'Exam not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Check permissions
+    if not request.user.is_admin and exam.created_by != request.user:
+        return Response(
+            {'error': 'Permission denied'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        statistics = exam.statistics
+    except ExamStatistics.DoesNotExist:
+        # Exams graded before statistics existed get their row on first read
+        statistics = rebuild_statistics(exam.pk)
+    
+    return Response(summarize(statistics, exam))
+
+@api_view(['GET'])
+@permission_classes([IsTeacherOrAdmin])
+def exam_item_analysis(request, pk):
+    """Get difficulty, discrimination and distractor counts of an exam's questions"""
+    try:
+        exam = Exam.objects.get(pk=pk)
+    except Exam.DoesNotExist:
+        return Response(
+            {'error': 'Exam not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Check permissions
+    if not request.user.is_admin and exam.created_by != request.user:
+        return Response(
+            {'error': 'Permission denied'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        return Response(analyze_exam(exam))
+    except ItemAnalysisUnavailable as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )